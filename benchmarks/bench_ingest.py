@@ -0,0 +1,40 @@
+"""Сравнение скорости сохранения вакансий в БД разными способами (DBManager.INGEST_METHODS).
+
+Запуск: python -m benchmarks.bench_ingest --rows 20000 --batch-size 1000
+Использует настройки подключения к БД из файла .env; таблицы БД очищаются."""
+
+import argparse
+import time
+
+from benchmarks.datagen import companies_of, generate_hh_vacancies, generate_vacancies
+from src.config import load_db_config
+from src.dbmanager import DBManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--employers', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    db_config = load_db_config()
+
+    # вакансии создаются заранее, чтобы в замер входило только сохранение
+    vacancies = list(generate_vacancies(args.rows, args.employers, args.seed))
+    companies = companies_of(generate_hh_vacancies(args.rows, args.employers, args.seed))
+
+    with DBManager(db_config, batch_size=args.batch_size) as db:
+        for method in DBManager.INGEST_METHODS:
+            db.clear()
+            db.save_companies(companies)
+            start = time.perf_counter()
+            db.save_vacancies(vacancies, method=method, refresh=False)
+            elapsed = time.perf_counter() - start
+            print(f"{method:>6}: {len(vacancies)} строк за {elapsed:.2f} с, {len(vacancies) / elapsed:,.0f} строк/с")
+        db.clear()
+
+
+if __name__ == '__main__':
+    main()
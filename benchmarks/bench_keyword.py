@@ -0,0 +1,65 @@
+"""Сравнение поиска вакансий по ключевому слову через полнотекстовый индекс (DBManager.get_vacancies_with_keyword)
+и через name ILIKE '%...%' на синтетической таблице.
+
+Запуск: python -m benchmarks.bench_keyword --rows 1000000
+Использует настройки подключения к БД из файла .env; таблицы БД очищаются."""
+
+import argparse
+import time
+
+from psycopg2 import sql
+
+from benchmarks.datagen import companies_of, generate_hh_vacancies, generate_vacancies
+from src.config import load_db_config
+from src.dbmanager import DBManager
+
+KEYWORDS = ['python', 'senior python developer', 'разработчик', 'аналитик данных', 'devops']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--employers', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    db_config = load_db_config()
+
+    with DBManager(db_config, batch_size=50000) as db:
+        db.clear()
+        db.save_companies(companies_of(generate_hh_vacancies(args.rows, args.employers, args.seed)))
+        start = time.perf_counter()
+        db.save_vacancies(generate_vacancies(args.rows, args.employers, args.seed), method='copy')
+        elapsed = time.perf_counter() - start
+        with db.cursor() as cur:
+            cur.execute("ANALYZE;")
+            cur.execute("SELECT COUNT(*) FROM vacancies;")
+            print(f"Загружено {cur.fetchone()[0]} вакансий за {elapsed:.1f} с")
+
+        ilike_query = sql.SQL("SELECT vacancy_id FROM vacancies WHERE NOT archived AND name ILIKE %s "
+                              "ORDER BY salary DESC, vacancy_id DESC")
+        for keyword in KEYWORDS:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                found = len(db.get_vacancies_with_keyword(keyword))
+            fts_time = (time.perf_counter() - start) / args.repeat
+
+            start = time.perf_counter()
+            with db.cursor() as cur:
+                for _ in range(args.repeat):
+                    cur.execute(ilike_query, (f'%{keyword}%',))
+                    ilike_found = len(cur.fetchall())
+            ilike_time = (time.perf_counter() - start) / args.repeat
+            print(f"'{keyword}': индекс {fts_time * 1000:.1f} мс ({found} вакансий), "
+                  f"ILIKE {ilike_time * 1000:.1f} мс ({ilike_found} вакансий)")
+
+        with db.cursor() as cur:
+            tsquery = db._keyword_tsquery(KEYWORDS[0])
+            cur.execute(sql.SQL("EXPLAIN ANALYZE {query}").format(query=db._keyword_query()), (tsquery, tsquery))
+            print('\n'.join(row[0] for row in cur.fetchall()))
+        db.clear()
+
+
+if __name__ == '__main__':
+    main()
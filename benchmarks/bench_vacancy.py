@@ -0,0 +1,52 @@
+"""Замер памяти на один объект Vacancy и времени создания объектов из строк результата запроса к БД.
+
+Запуск: python -m benchmarks.bench_vacancy --rows 100000 1000000"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from itertools import starmap
+
+from benchmarks.datagen import generate_vacancies
+from src.vacancy import Vacancy
+
+
+def make_rows(rows: int, employers: int = 100, seed: int = 0) -> list:
+    """создает строки результата запроса (vacancy_id, name, employer_id, employer_name, url, salary)
+    из синтетических вакансий benchmarks.datagen"""
+
+    return [(v.vacancy_id, v.name, v.employer_id, v.employer_name, v.url, v.salary)
+            for v in generate_vacancies(rows, employers, seed)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--employers', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for rows_count in args.rows:
+        rows = make_rows(rows_count, args.employers, args.seed)
+        rows_count = len(rows)
+        gc.collect()
+
+        tracemalloc.start()
+        vacancies = list(starmap(Vacancy, rows))
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del vacancies
+        gc.collect()
+
+        start = time.perf_counter()
+        vacancies = list(starmap(Vacancy, rows))
+        elapsed = time.perf_counter() - start
+        del vacancies
+
+        print(f"{rows_count:>9} вакансий: {size / rows_count:.0f} байт на вакансию, "
+              f"создание {elapsed:.2f} с ({rows_count / elapsed:,.0f} объектов/с)")
+
+
+if __name__ == '__main__':
+    main()
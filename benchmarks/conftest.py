@@ -0,0 +1,79 @@
+from datetime import datetime, timezone
+from functools import partial
+from typing import Callable, Iterator
+
+import pytest
+from psycopg2 import OperationalError
+
+from benchmarks.datagen import companies_of, generate_hh_vacancies, read_hh_vacancies
+from src.config import load_db_config
+from src.dbmanager import DBManager, DBManagerError
+from src.hh_api import salary_in_rur_or_none
+from src.vacancy import Vacancy
+
+
+def pytest_addoption(parser):
+    parser.addoption('--bench-rows', type=int, default=10000,
+                     help="количество синтетических вакансий в бенчмарках (по умолчанию 10000)")
+    parser.addoption('--bench-employers', type=int, default=100,
+                     help="количество компаний синтетических вакансий (по умолчанию 100)")
+    parser.addoption('--bench-data', metavar='FILE',
+                     help="файл с вакансиями (JSON Lines, см. benchmarks.datagen) вместо генерации вакансий")
+
+
+@pytest.fixture(scope='session')
+def bench_rows(request) -> int:
+    return request.config.getoption('--bench-rows')
+
+
+@pytest.fixture(scope='session')
+def hh_vacancies(request, bench_rows) -> Callable[[], Iterator[dict]]:
+    """функция, при каждом вызове заново лениво генерирующая одни и те же вакансии в формате API HeadHunter
+    (или читающая их из файла --bench-data): набор целиком в памяти не хранится"""
+
+    path = request.config.getoption('--bench-data')
+    if path:
+        return partial(read_hh_vacancies, path)
+    return partial(generate_hh_vacancies, bench_rows, request.config.getoption('--bench-employers'),
+                   now=datetime.now(timezone.utc))
+
+
+@pytest.fixture(scope='session')
+def companies(hh_vacancies):
+    return companies_of(hh_vacancies())
+
+
+@pytest.fixture(scope='session')
+def vacancies(hh_vacancies) -> Callable[[], Iterator[Vacancy]]:
+    """функция, при каждом вызове заново лениво создающая объекты вакансий с зарплатой в рублях
+    или с неуказанной зарплатой"""
+
+    return lambda: Vacancy.iter_objects(filter(salary_in_rur_or_none, hh_vacancies()))
+
+
+@pytest.fixture(scope='session')
+def vacancies_count(hh_vacancies) -> int:
+    """количество вакансий, создаваемых vacancies()"""
+
+    return sum(1 for _ in filter(salary_in_rur_or_none, hh_vacancies()))
+
+
+@pytest.fixture(scope='session')
+def db():
+    try:
+        db = DBManager(load_db_config(), batch_size=10000)
+    except (DBManagerError, OperationalError) as e:
+        pytest.skip(f"БД недоступна: {e}")
+    with db:
+        yield db
+        db.clear()
+
+
+@pytest.fixture(scope='session')
+def loaded_db(db, companies, vacancies):
+    """БД с сохраненными синтетическими вакансиями"""
+
+    db.clear()
+    db.save_companies(companies)
+    db.save_vacancies(vacancies(), method='copy')
+    return db
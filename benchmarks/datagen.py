@@ -0,0 +1,122 @@
+"""Генератор синтетических вакансий в формате API HeadHunter для бенчмарков.
+
+Вакансии генерируются детерминированно (одинаковые seed и номер вакансии дают одинаковые данные) и лениво,
+поэтому можно получать наборы от десятков тысяч до десятков миллионов вакансий без хранения в памяти.
+
+Запуск: python -m benchmarks.datagen --rows 10000000 --out vacancies.jsonl"""
+
+import argparse
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, List, Optional
+
+from src.hh_api import salary_in_rur_or_none
+from src.vacancy import Vacancy
+
+ROLES = ['Python', 'Java', 'Go', 'C++', 'Frontend', 'Backend', 'Fullstack', 'Data', 'ML', 'QA', 'DevOps', 'iOS',
+         'Android', '1С', 'PHP', 'Ruby', 'Scala', 'Kotlin', 'Rust', 'SRE']
+TITLES = ['developer', 'engineer', 'разработчик', 'инженер', 'тестировщик', 'аналитик', 'архитектор',
+          'team lead', 'менеджер проектов', 'специалист поддержки']
+LEVELS = ['Junior', 'Middle', 'Senior', 'Lead', 'Стажер', 'Ведущий', 'Главный']
+AREAS = [('1', 'Москва'), ('2', 'Санкт-Петербург'), ('3', 'Екатеринбург'), ('4', 'Новосибирск'), ('88', 'Казань')]
+SCHEDULES = [('fullDay', 'Полный день'), ('remote', 'Удаленная работа'), ('flexible', 'Гибкий график')]
+EXPERIENCE = [('noExperience', 'Нет опыта'), ('between1And3', 'От 1 года до 3 лет'),
+              ('between3And6', 'От 3 до 6 лет'), ('moreThan6', 'Более 6 лет')]
+# валюты зарплаты и их доли среди вакансий с указанной зарплатой
+CURRENCIES = (('RUR', 0.85), ('USD', 0.08), ('EUR', 0.04), ('KZT', 0.03))
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S%z'
+
+
+def generate_hh_vacancies(rows: int, employers: int = 100, seed: int = 0, salary_share: float = 0.6,
+                          period: timedelta = timedelta(days=30),
+                          now: Optional[datetime] = None) -> Iterator[dict]:
+    """лениво генерирует rows вакансий employers компаний в формате API HeadHunter.
+
+    Зарплата указана в доле salary_share вакансий (валюты - в пропорциях CURRENCIES), даты публикации
+    равномерно распределены по последнему периоду period перед now"""
+
+    rnd = random.Random(seed)
+    now = (now or datetime.now(timezone.utc)).replace(microsecond=0)
+    currencies, weights = zip(*CURRENCIES)
+    period_seconds = int(period.total_seconds())
+    for i in range(1, rows + 1):
+        employer_id = str(rnd.randrange(employers) + 1)
+        role, title = rnd.choice(ROLES), rnd.choice(TITLES)
+        salary = None
+        if rnd.random() < salary_share:
+            salary_from = rnd.randrange(30, 500) * 1000
+            salary_to = salary_from + rnd.randrange(0, 200) * 1000 if rnd.random() < 0.5 else None
+            salary = {'from': salary_from, 'to': salary_to, 'currency': rnd.choices(currencies, weights)[0],
+                      'gross': rnd.random() < 0.5}
+        area_id, area_name = rnd.choice(AREAS)
+        schedule_id, schedule_name = rnd.choice(SCHEDULES)
+        experience_id, experience_name = rnd.choice(EXPERIENCE)
+        yield {
+            'id': str(i),
+            'premium': False,
+            'name': f'{rnd.choice(LEVELS)} {role} {title}',
+            'department': None,
+            'has_test': rnd.random() < 0.1,
+            'area': {'id': area_id, 'name': area_name, 'url': f'https://api.hh.ru/areas/{area_id}'},
+            'salary': salary,
+            'type': {'id': 'open', 'name': 'Открытая'},
+            'published_at': (now - timedelta(seconds=rnd.randrange(period_seconds))).strftime(DATE_FORMAT),
+            'archived': False,
+            'url': f'https://api.hh.ru/vacancies/{i}?host=hh.ru',
+            'alternate_url': f'https://hh.ru/vacancy/{i}',
+            'employer': {
+                'id': employer_id,
+                'name': f'Company {employer_id}',
+                'url': f'https://api.hh.ru/employers/{employer_id}',
+                'alternate_url': f'https://hh.ru/employer/{employer_id}',
+                'trusted': True,
+            },
+            'snippet': {
+                'requirement': f'Опыт коммерческой разработки на {role}. Знание SQL, Git, Docker.',
+                'responsibility': f'Разработка и поддержка сервисов компании, {title}.',
+            },
+            'schedule': {'id': schedule_id, 'name': schedule_name},
+            'experience': {'id': experience_id, 'name': experience_name},
+            'employment': {'id': 'full', 'name': 'Полная занятость'},
+        }
+
+
+def generate_vacancies(rows: int, employers: int = 100, seed: int = 0) -> Iterator[Vacancy]:
+    """лениво создает объекты вакансий из синтетических вакансий generate_hh_vacancies(rows, employers, seed)
+    с зарплатой в рублях или с неуказанной зарплатой (как при получении вакансий с сервера)"""
+
+    return Vacancy.iter_objects(filter(salary_in_rur_or_none, generate_hh_vacancies(rows, employers, seed)))
+
+
+def read_hh_vacancies(path: str) -> Iterator[dict]:
+    """лениво читает вакансии из файла JSON Lines, созданного командой datagen --out"""
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def companies_of(vacancies: Iterable[dict]) -> List[dict]:
+    """возвращает список компаний вакансий в формате data/companies.json"""
+
+    employers = {v['employer']['id']: v['employer']['name'] for v in vacancies}
+    return [{employer_id: name} for employer_id, name in sorted(employers.items(), key=lambda e: int(e[0]))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--employers', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', required=True, help="файл для записи вакансий (JSON Lines)")
+    args = parser.parse_args()
+
+    with open(args.out, 'w', encoding='utf-8') as f:
+        for vacancy in generate_hh_vacancies(args.rows, args.employers, args.seed):
+            f.write(json.dumps(vacancy, ensure_ascii=False))
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+from itertools import islice
+
+import pytest
+
+from src.crawler import ShardedCrawler
+from tests.hh_stub import StubHHServer
+
+# локальный сервер просматривает все вакансии при каждом запросе, поэтому набор для получения ограничен
+MAX_FETCH_ROWS = 20000
+
+
+@pytest.fixture(scope='module')
+def server(hh_vacancies):
+    with StubHHServer(list(islice(hh_vacancies(), MAX_FETCH_ROWS))) as server:
+        yield server
+
+
+@pytest.mark.parametrize('concurrent', [False, True], ids=['sequential', 'concurrent'])
+def test_fetch_pages(benchmark, server, companies, concurrent):
+    hh_api = server.api(max_workers=4)
+    pages = benchmark(lambda: list(hh_api.iter_pages(companies[:1], concurrent)))
+    assert pages
+
+
+def test_fetch_sharded(benchmark, server, companies):
+    hh_api = server.api(max_workers=4)
+    vacancies = benchmark(lambda: list(ShardedCrawler(hh_api).crawl(companies)))
+    assert vacancies
@@ -0,0 +1,17 @@
+import pytest
+
+from src.dbmanager import DBManager
+
+
+@pytest.mark.parametrize('method', DBManager.INGEST_METHODS)
+def test_save_vacancies(benchmark, db, companies, vacancies, vacancies_count, method):
+    # вакансии создаются лениво во время сохранения, как при синхронизации, поэтому в замер входит
+    # и их генерация (одинаковая для всех способов сохранения)
+    def setup():
+        db.clear()
+        db.save_companies(companies)
+        return (vacancies(),), {'method': method, 'refresh': False}
+
+    benchmark.pedantic(db.save_vacancies, setup=setup, rounds=3)
+    db.refresh_stats()
+    assert sum(c['count'] for c in db.get_companies_and_vacancies_count()) == vacancies_count
@@ -0,0 +1,38 @@
+import json
+from itertools import islice
+
+import pytest
+
+from src import hh_json
+
+from src.hh_api import salary_in_rur_or_none
+from src.vacancy import Vacancy
+
+# скорость разбора не зависит от размера набора, поэтому разбирается только его начало
+MAX_PARSE_ROWS = 20000
+
+
+@pytest.fixture(scope='module')
+def pages(hh_vacancies):
+    """тела ответов сервера со страницами по 100 вакансий"""
+
+    vacancies = islice(hh_vacancies(), MAX_PARSE_ROWS)
+    return [json.dumps({'items': items}).encode('utf-8') for items in iter(lambda: list(islice(vacancies, 100)), [])]
+
+
+def test_decode_pages(benchmark, pages):
+    items = benchmark(lambda: [v for page in pages for v in json.loads(page)['items']])
+    assert items
+
+
+def test_cast_to_object_list(benchmark, pages):
+    rur_vacancies = [v for page in pages for v in json.loads(page)['items'] if salary_in_rur_or_none(v)]
+    vacancies = benchmark(Vacancy.cast_to_object_list, rur_vacancies)
+    assert len(vacancies) == len(rur_vacancies)
+
+
+@pytest.mark.parametrize('backend', sorted(hh_json.BACKENDS))
+def test_decode_vacancies_page(benchmark, pages, backend):
+    decode = hh_json.BACKENDS[backend]
+    vacancies = benchmark(lambda: [v for page in pages for v in decode(page).items])
+    assert vacancies
@@ -0,0 +1,62 @@
+import pytest
+
+# номер страницы для замера "глубокой" страницы; на небольших наборах берется последняя полная страница
+DEEP_PAGE = 100
+PAGE_SIZE = 50
+
+
+def test_get_all_vacancies(benchmark, loaded_db, vacancies_count):
+    assert len(benchmark(loaded_db.get_all_vacancies)) == vacancies_count
+
+
+def test_iter_all_vacancies(benchmark, loaded_db, vacancies_count):
+    assert benchmark(lambda: sum(1 for _ in loaded_db.iter_all_vacancies())) == vacancies_count
+
+
+@pytest.mark.parametrize('deep', [False, True], ids=['first', 'deep'])
+def test_get_vacancies_page(benchmark, loaded_db, vacancies_count, deep):
+    page = min(DEEP_PAGE, vacancies_count // PAGE_SIZE - 1) if deep else 0
+    if deep and page < 1:
+        pytest.skip(f"для глубокой страницы нужно больше {2 * PAGE_SIZE} вакансий")
+    after = None
+    for _ in range(page):
+        last = loaded_db.get_vacancies_page(PAGE_SIZE, after=after)[-1]
+        after = (last.salary, last.vacancy_id)
+    assert len(benchmark(loaded_db.get_vacancies_page, PAGE_SIZE, after=after)) == PAGE_SIZE
+
+
+def test_get_avg_salary(benchmark, loaded_db):
+    assert benchmark(loaded_db.get_avg_salary) > 0
+
+
+def test_get_vacancies_with_higher_salary(benchmark, loaded_db):
+    assert benchmark(loaded_db.get_vacancies_with_higher_salary)
+
+
+@pytest.mark.parametrize('keyword', ['python', 'senior python developer', 'аналитик'],
+                         ids=['python', 'senior-python-developer', 'analyst'])
+def test_get_vacancies_with_keyword(benchmark, loaded_db, keyword):
+    assert benchmark(loaded_db.get_vacancies_with_keyword, keyword)
+
+
+def test_get_companies_and_vacancies_count(benchmark, loaded_db, companies):
+    assert len(benchmark(loaded_db.get_companies_and_vacancies_count)) == len(companies)
+
+
+def test_get_employer_stats(benchmark, loaded_db, companies):
+    assert len(benchmark(loaded_db.get_employer_stats)) == len(companies)
+
+
+def test_export_snapshot(benchmark, loaded_db, vacancies_count, tmp_path):
+    pytest.importorskip('numpy')
+    counts = benchmark(loaded_db.export_snapshot, str(tmp_path))
+    assert counts['vacancies'] == vacancies_count
+
+
+@pytest.mark.parametrize('aggregate', ['percentiles', 'employer_distribution', 'histogram'])
+def test_salary_analytics(benchmark, loaded_db, aggregate):
+    pytest.importorskip('numpy')
+    from src.analytics import SalaryAnalytics
+
+    # новый объект на каждый замер, чтобы выгрузка из БД не бралась из кэша
+    assert benchmark(lambda: getattr(SalaryAnalytics(loaded_db), aggregate)())
@@ -0,0 +1,118 @@
+from typing import Dict, List, Optional, Sequence
+
+from src.dbmanager import DBManager
+from src.snapshot import require_numpy
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def _group_percentiles(values: 'np.ndarray', starts: 'np.ndarray', counts: 'np.ndarray', q: float) -> 'np.ndarray':
+    """вычисляет перцентиль q (с линейной интерполяцией, как np.percentile) каждой группы значений;
+    values отсортированы внутри групп, группа i занимает counts[i] значений, начиная с starts[i]"""
+
+    position = starts + (counts - 1) * q / 100
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, starts + counts - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class SalaryAnalytics:
+    """Аналитика зарплат ("от") активных вакансий, в которых указана зарплата.
+
+    Зарплаты и компании вакансий загружаются из БД одной выгрузкой (DBManager.get_salary_arrays) в массивы NumPy,
+    агрегаты вычисляются векторно. Загруженные данные и результаты кэшируются до следующего обновления
+    статистики БД (DBManager.stats_version), то есть до следующего сохранения данных через db"""
+
+    def __init__(self, db: DBManager):
+        require_numpy()
+        self.db = db
+        self.__version = None
+        self.__cache = {}
+
+    def _cached(self, key: tuple, compute):
+        if self.__version != self.db.stats_version:
+            self.__cache.clear()
+            self.__version = self.db.stats_version
+        if key not in self.__cache:
+            self.__cache[key] = compute()
+        return self.__cache[key]
+
+    def _data(self, keyword: Optional[str] = None) -> tuple:
+        """возвращает (компании, массивы зарплат), см. DBManager.get_salary_arrays"""
+
+        return self._cached(('data', keyword), lambda: self.db.get_salary_arrays(keyword))
+
+    def percentiles(self, q: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[float, int]:
+        """возвращает перцентили q зарплаты по всем вакансиям; пустой словарь, если зарплаты не указаны"""
+
+        def compute():
+            salaries = self._data()[1]['salary_from']
+            if not len(salaries):
+                return {}
+            return dict(zip(q, np.percentile(salaries, q).round().astype(int).tolist()))
+
+        return self._cached(('percentiles', tuple(q)), compute)
+
+    def employer_distribution(self, q: Sequence[float] = (25, 75)) -> List[dict]:
+        """возвращает для каждой компании, в вакансиях которой указана зарплата, количество таких вакансий,
+        среднюю, минимальную, медианную и максимальную зарплату и перцентили q ('percentiles');
+        компании упорядочены по убыванию медианной зарплаты"""
+
+        def compute():
+            employers, arrays = self._data()
+            codes, salaries = arrays['employer'], arrays['salary_from']
+            if not len(salaries):
+                return []
+            order = np.lexsort((salaries, codes))
+            codes, salaries = codes[order], salaries[order]
+            group_codes, starts, counts = np.unique(codes, return_index=True, return_counts=True)
+            stats = {
+                'count': counts,
+                'avg_salary': (np.add.reduceat(salaries, starts) / counts).round(),
+                'min_salary': salaries[starts],
+                'median_salary': _group_percentiles(salaries, starts, counts, 50).round(),
+                'max_salary': salaries[starts + counts - 1],
+            }
+            percentiles = {p: _group_percentiles(salaries, starts, counts, p).round() for p in q}
+            rows = [{**employers[code], **{key: int(values[i]) for key, values in stats.items()},
+                     'percentiles': {p: int(values[i]) for p, values in percentiles.items()}}
+                    for i, code in enumerate(group_codes.tolist())]
+            return sorted(rows, key=lambda row: (-row['median_salary'], row['company_name']))
+
+        return self._cached(('employer_distribution', tuple(q)), compute)
+
+    def histogram(self, bins: int = 10, salary_range: Optional[tuple] = None) -> List[dict]:
+        """возвращает гистограмму зарплат: bins интервалов равной ширины в пределах salary_range
+        (по умолчанию от минимальной до максимальной зарплаты) с количеством вакансий в каждом"""
+
+        def compute():
+            salaries = self._data()[1]['salary_from']
+            if not len(salaries):
+                return []
+            counts, edges = np.histogram(salaries, bins=bins, range=salary_range)
+            edges = edges.round().astype(int).tolist()
+            return [{'from': edges[i], 'to': edges[i + 1], 'count': count} for i, count in enumerate(counts.tolist())]
+
+        return self._cached(('histogram', bins, salary_range), compute)
+
+    def keyword_stats(self, keywords: Sequence[str]) -> List[dict]:
+        """возвращает для каждой строки поиска из keywords (сегмента вакансий, найденных по словам строки,
+        см. DBManager.get_vacancies_with_keyword) количество вакансий с указанной зарплатой, среднюю
+        и медианную зарплату, 25-й и 75-й перцентили, а также долю вакансий сегмента среди всех вакансий
+        с указанной зарплатой"""
+
+        def compute(keyword: str) -> dict:
+            salaries = self._data(keyword)[1]['salary_from']
+            total = len(self._data()[1]['salary_from'])
+            stats = {'keyword': keyword, 'count': len(salaries), 'share': len(salaries) / total if total else 0}
+            if not len(salaries):
+                return {**stats, 'avg_salary': None, 25: None, 50: None, 75: None}
+            percentiles = np.percentile(salaries, (25, 50, 75)).round().astype(int).tolist()
+            return {**stats, 'avg_salary': int(round(salaries.mean())), **dict(zip((25, 50, 75), percentiles))}
+
+        return [self._cached(('keyword_stats', keyword), lambda: compute(keyword)) for keyword in keywords]
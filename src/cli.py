@@ -0,0 +1,223 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, List, Optional
+
+from src.config import DEFAULT_CACHE_DIR, DEFAULT_COMPANIES_PATH, PROJECT_DIR, load_db_config
+from src.metrics import profiling, write_metrics
+
+# Модули, которые долго импортируются (requests, numpy) или нужны не всем командам, импортируются в функциях команд,
+# поэтому, например, запросы к БД (query) не загружают клиент API HeadHunter
+
+
+def _vacancy_record(vacancy) -> dict:
+    return {'vacancy_id': vacancy.vacancy_id, 'name': vacancy.name, 'employer_id': vacancy.employer_id,
+            'company_name': vacancy.employer_name, 'url': vacancy.url, 'salary': vacancy.salary or None}
+
+
+def write_records(records: Iterable[dict], output_format: str, output):
+    """выводит записи в output в формате JSON (список объектов) или CSV (заголовок - ключи первой записи;
+    списки выводятся через ';')"""
+
+    if output_format == 'json':
+        json.dump(list(records), output, ensure_ascii=False, indent=2, default=str)
+        output.write('\n')
+        return
+    writer = None
+    for record in records:
+        if writer is None:
+            writer = csv.DictWriter(output, fieldnames=list(record), lineterminator='\n')
+            writer.writeheader()
+        writer.writerow({key: ';'.join(map(str, value)) if isinstance(value, list) else value
+                         for key, value in record.items()})
+
+
+def run_sync(args, db_config: dict) -> tuple:
+    """синхронизирует вакансии компаний из файлов args.companies, обрабатывая файлы параллельно
+    (не более args.workers одновременно); возвращает (записи с результатами по файлам, код завершения)"""
+
+    from src.dbmanager import DBManager
+    from src.hh_api import HeadHunterAPI
+    from src.http_cache import DiskResponseCache
+    from src.sync import sync_vacancies
+    from src.utils import load_companies
+
+    paths = args.companies or [DEFAULT_COMPANIES_PATH]
+    cache = None
+    if not args.no_cache:
+        cache = DiskResponseCache(os.getenv('HH_CACHE_DIR', DEFAULT_CACHE_DIR),
+                                  ttl=int(os.getenv('HH_CACHE_TTL', '300')))
+    # один клиент на все файлы: ограничение частоты запросов к API общее
+    hh_api = HeadHunterAPI(base_url=args.base_url, cache=cache)
+
+    with DBManager(db_config, maxconn=args.workers + 1) as db:
+        def sync_file(path: str) -> dict:
+            record = {'file': path, 'companies': 0, 'fetched': 0, 'archived': 0, 'failed': [], 'error': None}
+            try:
+                companies = load_companies(path)
+            except (OSError, ValueError) as e:
+                return dict(record, error=f"Не удалось загрузить файл с id компаний: {e}")
+            result = sync_vacancies(hh_api, db, companies, full=args.full)
+            return dict(record, companies=len(companies), **result)
+
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            records = list(executor.map(sync_file, paths))
+    return records, int(any(r['failed'] or r['error'] for r in records))
+
+
+def _query_records(db, args) -> Iterable[dict]:
+    """возвращает записи результата запроса args.query"""
+
+    if args.query == 'avg-salary':
+        return [{'avg_salary': db.get_avg_salary()}]
+    if args.query == 'companies':
+        return db.get_employer_stats()
+    if args.query in ('vacancies', 'higher-salary', 'keyword'):
+        if args.query == 'vacancies':
+            vacancies = db.iter_all_vacancies()
+        elif args.query == 'higher-salary':
+            vacancies = db.iter_vacancies_with_higher_salary()
+        else:
+            vacancies = db.iter_vacancies_with_keyword(' '.join(args.keyword))
+        return map(_vacancy_record, islice(vacancies, args.limit))
+
+    from src.analytics import SalaryAnalytics
+
+    analytics = SalaryAnalytics(db)
+    if args.query == 'percentiles':
+        return [{'percentile': q, 'salary': salary} for q, salary in analytics.percentiles().items()]
+    if args.query == 'employer-distribution':
+        return [{**{key: value for key, value in d.items() if key != 'percentiles'},
+                 **{f'p{q}': value for q, value in d['percentiles'].items()}}
+                for d in analytics.employer_distribution()]
+    if args.query == 'histogram':
+        return analytics.histogram(args.bins)
+    return [{'keyword': s['keyword'], 'count': s['count'], 'share': s['share'], 'avg_salary': s['avg_salary'],
+             'p25': s[25], 'median_salary': s[50], 'p75': s[75]}
+            for s in analytics.keyword_stats(args.keyword)]
+
+
+def run_query(args, db_config: dict, output):
+    from src.dbmanager import DBManager
+
+    if args.query in ('keyword', 'keyword-stats') and not args.keyword:
+        raise ValueError(f"Для запроса '{args.query}' необходимо указать ключевые слова (--keyword)")
+    with DBManager(db_config, maxconn=1) as db:
+        write_records(_query_records(db, args), args.format, output)
+
+
+def run_export(args, db_config: dict) -> List[dict]:
+    from src.dbmanager import DBManager
+
+    with DBManager(db_config, maxconn=1) as db:
+        counts = db.export_snapshot(args.directory)
+    return [{'table': table, 'rows': rows} for table, rows in counts.items()]
+
+
+def run_bench(args, pytest_args: List[str]) -> int:
+    """запускает бенчмарки из каталога benchmarks с сохранением результатов (pytest-benchmark)
+    в каталог .benchmarks проекта; pytest_args - дополнительные параметры pytest"""
+
+    import pytest
+
+    pytest_args = [os.path.join(PROJECT_DIR, 'benchmarks'), '--bench-rows', str(args.rows), '--benchmark-autosave',
+                   f"--benchmark-storage={os.path.join(PROJECT_DIR, '.benchmarks')}", *pytest_args]
+    if args.compare:
+        pytest_args += ['--benchmark-compare', f'--benchmark-compare-fail=mean:{args.compare}']
+    return pytest.main(pytest_args)
+
+
+def make_parser() -> argparse.ArgumentParser:
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument('--format', choices=('json', 'csv'), default='json', help="формат вывода (по умолчанию json)")
+    output.add_argument('--output', '-o', metavar='FILE', help="файл для вывода (по умолчанию стандартный вывод)")
+
+    parser = argparse.ArgumentParser(prog='vacancies-db',
+                                     description="Вакансии компаний с hh.ru в базе данных PostgreSQL. Параметры "
+                                                 "подключения к БД берутся из переменных окружения или файла .env")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="сохранить метрики работы в файл (.prom - формат Prometheus, иначе JSON)")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="профилировать (cProfile) и сохранить статистику в файл; сводка выводится в stderr")
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help="вывести в stderr места наибольшего выделения памяти")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    sync = commands.add_parser('sync', parents=[output], help="синхронизировать вакансии компаний с сервером hh.ru")
+    sync.add_argument('companies', nargs='*', metavar='FILE',
+                      help="файлы со списками компаний в формате data/companies.json "
+                           "(по умолчанию data/companies.json проекта)")
+    sync.add_argument('--workers', type=int, default=2, help="количество файлов, обрабатываемых одновременно")
+    sync.add_argument('--full', action='store_true', help="полная синхронизация (по умолчанию - инкрементальная)")
+    sync.add_argument('--no-cache', action='store_true', help="не использовать кэш ответов API hh.ru")
+    sync.add_argument('--base-url', default='https://api.hh.ru/vacancies', help=argparse.SUPPRESS)
+
+    query = commands.add_parser('query', parents=[output], help="получить данные из БД")
+    query.add_argument('query', choices=('avg-salary', 'companies', 'vacancies', 'higher-salary', 'keyword',
+                                         'percentiles', 'employer-distribution', 'histogram', 'keyword-stats'))
+    query.add_argument('--keyword', '-k', action='append', default=[],
+                       help="ключевые слова для запросов keyword и keyword-stats (можно указать несколько раз)")
+    query.add_argument('--limit', type=int, help="максимальное количество вакансий")
+    query.add_argument('--bins', type=int, default=10, help="количество интервалов гистограммы")
+
+    export = commands.add_parser('export', parents=[output], help="сохранить снимок данных БД в каталог")
+    export.add_argument('directory')
+
+    bench = commands.add_parser('bench', help="запустить бенчмарки и сохранить результаты")
+    bench.add_argument('--rows', type=int, default=10000, help="количество синтетических вакансий")
+    bench.add_argument('--compare', metavar='PERCENT',
+                       help="сравнить с последним сохраненным запуском; ошибка, если среднее время выросло больше, "
+                            "чем на PERCENT (например, 10%%)")
+    bench.epilog = "остальные параметры передаются pytest (например, -k ingest)"
+    return parser
+
+
+def run_command(args, pytest_args: List[str]) -> int:
+    """выполняет команду args.command; возвращает код завершения"""
+
+    if args.command == 'bench':
+        return run_bench(args, pytest_args)
+
+    from src.dbmanager import DBManagerError
+
+    output = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    try:
+        db_config = load_db_config()
+        exit_code = 0
+        if args.command == 'sync':
+            records, exit_code = run_sync(args, db_config)
+            write_records(records, args.format, output)
+        elif args.command == 'query':
+            run_query(args, db_config, output)
+        else:
+            write_records(run_export(args, db_config), args.format, output)
+        return exit_code
+    except (DBManagerError, ValueError, ImportError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = make_parser()
+    args, unknown = parser.parse_known_args(argv)
+    if unknown and args.command != 'bench':
+        parser.error(f"unrecognized arguments: {' '.join(unknown)}")
+
+    try:
+        # сводка профилирования выводится в stderr, чтобы не смешиваться с результатами команды
+        with profiling(args.profile, args.tracemalloc, stream=sys.stderr):
+            return run_command(args, unknown)
+    finally:
+        if args.metrics:
+            write_metrics(args.metrics)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
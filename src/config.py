@@ -0,0 +1,21 @@
+import os
+
+# корневой каталог проекта; пути к файлам проекта не зависят от текущего каталога
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_COMPANIES_PATH = os.path.join(PROJECT_DIR, 'data', 'companies.json')
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'vacancies-db')
+
+
+def load_db_config() -> dict:
+    """возвращает параметры подключения к БД из переменных окружения (и файла .env, если он найден)"""
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return {
+        'dbname': os.getenv('POSTGRES_DB'),
+        'user': os.getenv('POSTGRES_USER'),
+        'password': os.getenv('POSTGRES_PASSWORD'),
+        'host': os.getenv('POSTGRES_HOST', 'localhost'),
+        'port': os.getenv('POSTGRES_PORT', '5432')
+    }
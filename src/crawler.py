@@ -0,0 +1,138 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+
+from src.hh_api import HeadHunterAPI, HHAPIError
+from src.vacancy import Vacancy
+
+
+class Shard:
+    """Часть поискового запроса: вакансии одной компании, опубликованные в интервале [date_from, date_to].
+    Незаданная граница интервала означает, что интервал с этой стороны не ограничен."""
+
+    def __init__(self, employer_id: str, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+        self.employer_id = employer_id
+        self.date_from = date_from
+        self.date_to = date_to
+
+    def __repr__(self):
+        date_from = self.date_from.isoformat(timespec='seconds') if self.date_from else '...'
+        date_to = self.date_to.isoformat(timespec='seconds') if self.date_to else '...'
+        return f"Shard({self.employer_id}, {date_from} - {date_to})"
+
+    @property
+    def params(self) -> dict:
+        """параметры поискового запроса для части"""
+
+        params = {'employer_id': self.employer_id}
+        if self.date_from is not None:
+            params['date_from'] = self.date_from.strftime('%Y-%m-%dT%H:%M:%S%z')
+        if self.date_to is not None:
+            params['date_to'] = self.date_to.strftime('%Y-%m-%dT%H:%M:%S%z')
+        return params
+
+    def split(self, now: datetime, period: timedelta, min_span: timedelta) -> List['Shard']:
+        """делит интервал дат пополам; для неограниченного слева интервала за его начало при делении
+        принимается date_to - period. Возвращает пустой список, если интервал короче min_span"""
+
+        date_to = self.date_to or now
+        date_from = self.date_from or date_to - period
+        if date_to - date_from < min_span:
+            return []
+        middle = date_from + (date_to - date_from) / 2
+        return [Shard(self.employer_id, self.date_from, middle), Shard(self.employer_id, middle, self.date_to)]
+
+
+class ShardedCrawler:
+    """Класс для получения всех вакансий компаний в обход ограничения API HeadHunter в 2000 результатов на запрос.
+
+    Запрос разбивается на части по компаниям; часть, в которой найдено больше вакансий, чем можно получить
+    постранично, делится по дате публикации до тех пор, пока каждая часть не уложится в ограничение.
+    Части обрабатываются параллельно, при ошибке получения страницы часть запрашивается повторно
+    (не более retries раз). После обработки каждой части вызывается on_progress(shard, получено, найдено).
+    Количество найденных вакансий компаний, запрошенных без ограничения по дате, сохраняется в found
+    (включая вакансии, отброшенные из-за валюты зарплаты)."""
+
+    max_results = 2000
+
+    def __init__(self, hh_api: HeadHunterAPI, max_workers: int = 4, retries: int = 2,
+                 on_progress: Optional[Callable[[Shard, int, int], None]] = None,
+                 period: timedelta = timedelta(days=30), min_span: timedelta = timedelta(minutes=1)):
+        self.hh_api = hh_api
+        self.max_workers = max_workers
+        self.retries = retries
+        self.on_progress = on_progress
+        self.period = period
+        self.min_span = min_span
+        self.failed_shards: List[Shard] = []
+        self.found: Dict[str, int] = {}
+
+    def _fetch_shard(self, shard: Shard, now: datetime) -> tuple:
+        """получает вакансии части; возвращает (вакансии, найдено, части для повторного запроса)
+        или (None, 0, []), если получить страницы не удалось"""
+
+        try:
+            return self._fetch_shard_pages(shard, now)
+        except HHAPIError:
+            return None, 0, []
+
+    def _fetch_shard_pages(self, shard: Shard, now: datetime) -> tuple:
+        params = dict(self.hh_api.params, **shard.params)
+        first_page = self.hh_api.get_vacancies_page(params, 0)
+        if first_page.found > self.max_results:
+            children = shard.split(now, self.period, self.min_span)
+            if children:
+                return [], first_page.found, children
+
+        vacancies = first_page.items
+        for page in range(1, first_page.pages):
+            vacancies.extend(self.hh_api.get_vacancies_page(params, page).items)
+        return vacancies, first_page.found, []
+
+    def count(self, employer_id: str) -> int:
+        """возвращает количество вакансий компании в выдаче поиска (found) без получения самих вакансий;
+        при ошибке получения страницы выбрасывает HHAPIError"""
+
+        params = dict(self.hh_api.params, **Shard(employer_id).params, per_page=1)
+        return self.hh_api.get_vacancies_page(params, 0).found
+
+    def crawl(self, employers: List[dict], since: Optional[Dict[str, datetime]] = None) -> Iterator[Vacancy]:
+        """возвращает объекты вакансий, опубликованные заданными компаниями (из списка employers),
+        с зарплатой в рублях, либо с неуказанным значением зарплаты, без повторов.
+        Для компаний из словаря since запрашиваются только вакансии, опубликованные начиная с указанного времени"""
+
+        since = since or {}
+
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        self.failed_shards = []
+        self.found = {}
+        seen = set()
+        attempts = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {executor.submit(self._fetch_shard, shard, now): shard
+                       for shard in (Shard(employer_id, since.get(employer_id))
+                                     for employer_id in (list(e.keys())[0] for e in employers))}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    shard = pending.pop(future)
+                    vacancies, found, children = future.result()
+                    if vacancies is None:
+                        attempts[shard] = attempts.get(shard, 0) + 1
+                        if attempts[shard] <= self.retries:
+                            pending[executor.submit(self._fetch_shard, shard, now)] = shard
+                        else:
+                            self.failed_shards.append(shard)
+                        continue
+                    if shard.date_from is None and shard.date_to is None:
+                        self.found[shard.employer_id] = found
+                    for child in children:
+                        pending[executor.submit(self._fetch_shard, child, now)] = child
+                    if children:
+                        continue
+                    if self.on_progress is not None:
+                        self.on_progress(shard, len(vacancies), found)
+                    for vacancy in vacancies:
+                        if vacancy.vacancy_id not in seen:
+                            seen.add(vacancy.vacancy_id)
+                            yield vacancy
@@ -1,162 +1,683 @@
-import psycopg2
-from typing import List
+import io
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import count, islice, starmap
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
-from colorama import Fore, Style
-from psycopg2 import OperationalError, sql
+from psycopg2 import InterfaceError, OperationalError, extensions, sql
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
 
+from src.metrics import metrics, timed
 from src.vacancy import Vacancy
 
+if TYPE_CHECKING:
+    # numpy - необязательная зависимость, нужна только для снимков данных и аналитики зарплат
+    import numpy as np
+
+
+def _batches(rows: Iterable[tuple], batch_size: int) -> Iterator[List[tuple]]:
+    """разбивает строки на пакеты не больше batch_size, оставляя в пакете только последнюю строку с каждым ключом
+    (первым элементом кортежа): ON CONFLICT DO UPDATE не может изменить одну строку дважды в одной команде"""
+
+    rows = iter(rows)
+    while True:
+        batch = {row[0]: row for row in islice(rows, batch_size)}
+        if not batch:
+            return
+        yield list(batch.values())
+
+
+def _copy_value(value) -> str:
+    """приводит значение к текстовому формату COPY"""
+
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+# Миграции схемы БД в порядке применения; номер версии схемы - количество примененных миграций.
+# Первая миграция написана так, чтобы ее можно было применить и к БД, созданной до введения версий схемы
+_MIGRATIONS = (
+    """
+    CREATE TABLE IF NOT EXISTS {employers} (
+    employer_id VARCHAR(255) PRIMARY KEY,
+    employer_name VARCHAR(255) NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS {vacancies} (
+    vacancy_id VARCHAR(255) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    employer_id VARCHAR(255) REFERENCES {employers}(employer_id),
+    url VARCHAR(255) NOT NULL,
+    salary INT DEFAULT 0
+    );
+    ALTER TABLE {vacancies}
+    ADD COLUMN IF NOT EXISTS published_at TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS archived BOOLEAN NOT NULL DEFAULT FALSE,
+    ADD COLUMN IF NOT EXISTS name_tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector({config}, name)) STORED;
+    CREATE INDEX IF NOT EXISTS {vacancies_salary_idx} ON {vacancies} (salary DESC, vacancy_id DESC);
+    CREATE INDEX IF NOT EXISTS {vacancies_name_tsv_idx} ON {vacancies} USING GIN (name_tsv);
+    CREATE TABLE IF NOT EXISTS {sync_state} (
+    employer_id VARCHAR(255) PRIMARY KEY REFERENCES {employers}(employer_id),
+    synced_at TIMESTAMPTZ NOT NULL
+    );
+    """,
+    # зарплата "от" и "до" хранятся отдельно, неуказанная зарплата - NULL, а не 0;
+    # salary остается для сортировки и постраничного вывода (0 для неуказанной зарплаты)
+    """
+    ALTER TABLE {vacancies} ADD COLUMN salary_from INT, ADD COLUMN salary_to INT;
+    UPDATE {vacancies} SET salary_from = NULLIF(salary, 0);
+    ALTER TABLE {vacancies} DROP COLUMN salary;
+    ALTER TABLE {vacancies} ADD COLUMN salary INT GENERATED ALWAYS AS (COALESCE(salary_from, 0)) STORED;
+    CREATE INDEX {vacancies_salary_idx} ON {vacancies} (salary DESC, vacancy_id DESC);
+    CREATE INDEX {vacancies_employer_id_idx} ON {vacancies} (employer_id);
+    """,
+    # статистика по компаниям для запросов меню; обновляется после изменения данных (DBManager.refresh_stats)
+    """
+    CREATE MATERIALIZED VIEW {employer_stats} AS
+    SELECT employer_id, employer_name, COUNT(vacancy_id) AS vacancies_count,
+    COUNT(salary_from) AS salary_count, SUM(salary_from) AS salary_sum,
+    AVG(salary_from) AS avg_salary, MIN(salary_from) AS min_salary, MAX(salary_from) AS max_salary
+    FROM {employers}
+    LEFT JOIN (SELECT vacancy_id, employer_id, salary_from FROM {vacancies} WHERE NOT archived) AS active
+    USING(employer_id)
+    GROUP BY employer_id, employer_name;
+    CREATE UNIQUE INDEX {employer_stats_employer_id_idx} ON {employer_stats} (employer_id);
+    """,
+    # количество вакансий компании в выдаче поиска, которые не сохраняются в БД (зарплата не в рублях),
+    # на момент последней синхронизации; NULL - неизвестно
+    """
+    ALTER TABLE {sync_state} ADD COLUMN skipped INT;
+    """,
+)
+
+
+class VacancyCursor(extensions.cursor):
+    """Курсор, возвращающий строки результата запроса
+    (vacancy_id, name, employer_id, employer_name, url, salary[, published_at]) в виде объектов Vacancy"""
+
+    def fetchone(self) -> Optional[Vacancy]:
+        row = super().fetchone()
+        return None if row is None else Vacancy(*row)
+
+    def fetchmany(self, size: Optional[int] = None) -> List[Vacancy]:
+        rows = super().fetchmany() if size is None else super().fetchmany(size)
+        return list(starmap(Vacancy, rows))
+
+    def fetchall(self) -> List[Vacancy]:
+        return list(starmap(Vacancy, super().fetchall()))
+
+    def __iter__(self) -> Iterator[Vacancy]:
+        return self
+
+    def __next__(self) -> Vacancy:
+        return Vacancy(*super().__next__())
+
+
+class DBManagerError(Exception):
+    """Ошибка подключения к базе данных"""
+
 
 class DBManager:
+    """Класс для работы с базой данных вакансий.
+
+    Подключения к БД берутся из пула (не больше maxconn одновременно), каждый вызов метода выполняется
+    в отдельной транзакции на своем курсоре, поэтому один объект DBManager можно использовать из нескольких потоков.
+    Перед использованием подключение, простаивавшее дольше health_check_interval секунд, проверяется; разорванные
+    подключения заменяются новыми, при ошибке подключения попытки повторяются (не более connect_retries раз)
+    с экспоненциально растущей задержкой. Если подключиться не удалось, выбрасывается DBManagerError.
 
-    def __init__(self, params: dict):
+    Сохранение данных поддерживает три способа (параметр method):
+    'row' - отдельный INSERT на каждую строку,
+    'values' - пакетный INSERT через execute_values,
+    'copy' - загрузка пакета во временную таблицу через COPY FROM STDIN и слияние одним INSERT ... ON CONFLICT."""
+
+    INGEST_METHODS = ('row', 'values', 'copy')
+    # колонки таблиц в снимке данных (export_snapshot/import_snapshot) и их типы (см. src.snapshot.COLUMN_TYPES)
+    SNAPSHOT_COLUMNS = {
+        'employers': {'employer_id': 'str', 'employer_name': 'str'},
+        'vacancies': {'vacancy_id': 'str', 'name': 'str', 'employer_id': 'str', 'url': 'str', 'salary_from': 'int',
+                      'salary_to': 'int', 'published_at': 'datetime', 'archived': 'bool'},
+    }
+    # конфигурация полнотекстового поиска: русские слова и английские (asciiword) приводятся к основе
+    TEXT_SEARCH_CONFIG = 'russian'
+
+    def __init__(self, params: dict, batch_size: int = 1000, itersize: int = 2000, minconn: int = 1,
+                 maxconn: int = 4, connect_retries: int = 3, retry_delay: float = 0.5,
+                 health_check_interval: float = 30):
         self.__vacancies_table_name = 'vacancies'
         self.__employers_table_name = 'employers'
-        self._connect_to_database(params)
+        self.__sync_state_table_name = 'sync_state'
+        self.__schema_version_table_name = 'schema_version'
+        self.__employer_stats_view_name = 'employer_stats'
+        self.batch_size = batch_size
+        self.itersize = itersize
+        self.__cursor_ids = count()
+        self.__stats_version = 0
+        self.connect_retries = connect_retries
+        self.retry_delay = retry_delay
+        self.health_check_interval = health_check_interval
+        self.__pool = None
+        self.__pool_slots = threading.BoundedSemaphore(maxconn)
+        self.__last_used = {}
+        self._connect_to_database(params, minconn, maxconn)
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.conn is not None:
-            self.conn.close()
+        self.close()
+
+    def close(self):
+        """Закрывает все подключения к базе данных"""
+
+        if self.__pool is not None and not self.__pool.closed:
+            self.__pool.closeall()
+
+    def _retry(self, action: Callable, description: str):
+        """выполняет action, повторяя попытку при ошибке подключения к БД с экспоненциально растущей задержкой"""
+
+        for attempt in range(self.connect_retries + 1):
+            try:
+                return action()
+            except (OperationalError, InterfaceError) as e:
+                if attempt == self.connect_retries:
+                    raise DBManagerError(f"{description}: {e}") from e
+                time.sleep(self.retry_delay * 2 ** attempt)
 
-    def _connect_to_database(self, params: dict):
-        """Подключение к базе данных и создание (в случае их отсутствия)
+    def _connect_to_database(self, params: dict, minconn: int, maxconn: int):
+        """Создание пула подключений к базе данных и создание (в случае их отсутствия)
         таблиц для сохранения данных о компаниях и вакансиях"""
 
+        self.__pool = self._retry(lambda: ThreadedConnectionPool(minconn, maxconn, **params),
+                                  f"Ошибка подключения к базе данных {params.get('dbname')}")
         try:
-            self.conn = psycopg2.connect(**params)
-            self.cur = self.conn.cursor()
             self._create_tables()
-        except OperationalError as e:
-            self.conn = None
-            print(f"{Fore.RED}Ошибка подключения к базе данных {params['dbname']}:\n", e)
-            print(Style.RESET_ALL)
-            exit()
+        except Exception:
+            self.close()
+            raise
+
+    def _is_alive(self, conn) -> bool:
+        """проверяет подключение, если оно простаивало дольше health_check_interval секунд"""
+
+        if conn.closed:
+            return False
+        if time.monotonic() - self.__last_used.get(id(conn), 0) < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+        except (OperationalError, InterfaceError):
+            return False
+        return True
+
+    def _getconn(self):
+        """берет из пула рабочее подключение, заменяя разорванные подключения новыми"""
+
+        conn = self.__pool.getconn()
+        if not self._is_alive(conn):
+            self.__pool.putconn(conn, close=True)
+            raise OperationalError("подключение к базе данных разорвано")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """возвращает подключение из пула на время блока with; если пул исчерпан, ожидает освобождения подключения"""
+
+        with self.__pool_slots:
+            conn = self._retry(self._getconn, "Ошибка подключения к базе данных")
+            try:
+                yield conn
+            finally:
+                if conn.closed:
+                    self.__last_used.pop(id(conn), None)
+                else:
+                    self.__last_used[id(conn)] = time.monotonic()
+                self.__pool.putconn(conn, close=bool(conn.closed))
+
+    @contextmanager
+    def cursor(self, **kwargs):
+        """возвращает курсор (параметры kwargs передаются в connection.cursor) на подключении из пула;
+        блок with выполняется в отдельной транзакции, которая фиксируется при выходе из блока
+        или откатывается при исключении"""
+
+        with self.connection() as conn, conn, conn.cursor(**kwargs) as cur:
+            yield cur
 
     def _create_tables(self):
-        with self.conn:
-            self.cur.execute(sql.SQL("""
-                        CREATE TABLE IF NOT EXISTS {employers} (
-                        employer_id VARCHAR(255) PRIMARY KEY,
-                        employer_name VARCHAR(255) NOT NULL
-                        );
-                        """).format(employers=sql.Identifier(self.__employers_table_name)))
-            self.conn.commit()
-            self.cur.execute(sql.SQL("""
-            CREATE TABLE IF NOT EXISTS {vacancies} (
-            vacancy_id VARCHAR(255) PRIMARY KEY,
-            name VARCHAR(255) NOT NULL,
-            employer_id VARCHAR(255) REFERENCES {employers}(employer_id),
-            url VARCHAR(255) NOT NULL,
-            salary INT DEFAULT 0
-            );
-            """).format(vacancies=sql.Identifier(self.__vacancies_table_name),
-                        employers=sql.Identifier(self.__employers_table_name)))
+        """приводит схему БД к последней версии, применяя еще не примененные миграции из _MIGRATIONS.
+        Номер версии схемы хранится в таблице schema_version"""
+
+        names = {
+            'vacancies': sql.Identifier(self.__vacancies_table_name),
+            'employers': sql.Identifier(self.__employers_table_name),
+            'sync_state': sql.Identifier(self.__sync_state_table_name),
+            'schema_version': sql.Identifier(self.__schema_version_table_name),
+            'employer_stats': sql.Identifier(self.__employer_stats_view_name),
+            'employer_stats_employer_id_idx': sql.Identifier(f'{self.__employer_stats_view_name}_employer_id_idx'),
+            'config': sql.Literal(self.TEXT_SEARCH_CONFIG),
+        }
+        for index in ('salary_idx', 'name_tsv_idx', 'employer_id_idx'):
+            names[f'vacancies_{index}'] = sql.Identifier(f'{self.__vacancies_table_name}_{index}')
+
+        with self.cursor() as cur:
+            cur.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {schema_version} (version INT NOT NULL);").format(
+                **names))
+            # блокировка до конца транзакции, чтобы несколько процессов не применяли миграции одновременно
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (self.__schema_version_table_name,))
+            cur.execute(sql.SQL("SELECT COALESCE(MAX(version), 0) FROM {schema_version};").format(**names))
+            current_version = cur.fetchone()[0]
+            for version, migration in enumerate(_MIGRATIONS[current_version:], current_version + 1):
+                cur.execute(sql.SQL(migration).format(**names))
+                cur.execute(sql.SQL("INSERT INTO {schema_version} (version) VALUES (%s);").format(**names),
+                                 (version,))
 
     def clear(self):
         """Очищает таблицы БД"""
 
-        with self.conn:
+        with self.cursor() as cur:
 
-            self.cur.execute(sql.SQL("""
+            cur.execute(sql.SQL("""
             TRUNCATE TABLE {vacancies} CASCADE;
             """).format(vacancies=sql.Identifier(self.__vacancies_table_name)))
-            self.conn.commit()
-            self.cur.execute(sql.SQL("""
+            cur.execute(sql.SQL("""
                                     TRUNCATE TABLE {employers} CASCADE;
                                     """).format(employers=sql.Identifier(self.__employers_table_name)))
+        self.refresh_stats()
+
+    @timed('db_query_seconds')
+    def refresh_stats(self):
+        """Обновляет статистику по компаниям (материализованное представление employer_stats).
+        Обновление не блокирует чтение статистики другими подключениями"""
+
+        with self.cursor() as cur:
+            cur.execute(sql.SQL("REFRESH MATERIALIZED VIEW CONCURRENTLY {employer_stats};").format(
+                employer_stats=sql.Identifier(self.__employer_stats_view_name)))
+        self.__stats_version += 1
 
+    @property
+    def stats_version(self) -> int:
+        """номер обновления статистики: увеличивается при каждом вызове refresh_stats этого объекта (в том числе
+        после сохранения данных с refresh=True); по нему кэши, построенные по данным БД, определяют устаревание"""
 
+        return self.__stats_version
+
+    @timed('db_query_seconds')
     def get_companies_and_vacancies_count(self) -> List[dict]:
         """получает список всех компаний и количество вакансий у каждой компании"""
 
-        with self.conn:
-            self.cur.execute(sql.SQL("SELECT employer_name, COUNT(vacancy_id) from {employers} "
-                                     "LEFT JOIN {vacancies} "
-                                     "USING(employer_id) "
-                                     "GROUP BY employer_name "
-                                     "ORDER BY COUNT(vacancy_id) DESC").format(
-                vacancies=sql.Identifier(self.__vacancies_table_name),
-                employers=sql.Identifier(self.__employers_table_name)))
-            data = self.cur.fetchall()
+        with self.cursor() as cur:
+            cur.execute(sql.SQL("SELECT employer_name, vacancies_count FROM {employer_stats} "
+                                "ORDER BY vacancies_count DESC").format(
+                employer_stats=sql.Identifier(self.__employer_stats_view_name)))
+            data = cur.fetchall()
             vacancies = [{'company_name': d[0], 'count': d[1]} for d in data]
             return vacancies
 
+    @timed('db_query_seconds')
+    def get_employer_stats(self) -> List[dict]:
+        """получает для каждой компании количество вакансий, среднюю, минимальную и максимальную зарплату
+        (по вакансиям, в которых указана зарплата)"""
+
+        with self.cursor() as cur:
+            cur.execute(sql.SQL("SELECT employer_id, employer_name, vacancies_count, "
+                                "avg_salary, min_salary, max_salary FROM {employer_stats} "
+                                "ORDER BY vacancies_count DESC, employer_name").format(
+                employer_stats=sql.Identifier(self.__employer_stats_view_name)))
+            return [{'employer_id': d[0], 'company_name': d[1], 'count': d[2],
+                     'avg_salary': round(d[3]) if d[3] is not None else None, 'min_salary': d[4], 'max_salary': d[5]}
+                    for d in cur.fetchall()]
+
+    def _vacancies_query(self, condition: sql.Composable = sql.SQL('TRUE'),
+                         order: sql.Composable = sql.SQL('salary DESC, vacancy_id DESC')) -> sql.Composed:
+        """запрос активных вакансий с названием компании, удовлетворяющих условию condition,
+        упорядоченных по order (по умолчанию по убыванию зарплаты и id вакансии)"""
+
+        return sql.SQL("SELECT vacancy_id, name, employer_id, employer_name, url, salary FROM {vacancies} "
+                       "JOIN {employers} USING(employer_id) "
+                       "WHERE NOT archived AND ({condition}) "
+                       "ORDER BY {order}").format(
+            vacancies=sql.Identifier(self.__vacancies_table_name),
+            employers=sql.Identifier(self.__employers_table_name),
+            condition=condition, order=order)
+
+    def _fetch_vacancies(self, query: sql.Composable, params: Optional[tuple] = None) -> List[Vacancy]:
+        """выполняет запрос вакансий и возвращает список всех вакансий из результата"""
+
+        with self.cursor(cursor_factory=VacancyCursor) as cur:
+            cur.execute(query, params)
+            return cur.fetchall()
+
+    def _iter_vacancies(self, query: sql.Composable, params: Optional[tuple] = None,
+                        itersize: Optional[int] = None) -> Iterator[Vacancy]:
+        """выполняет запрос вакансий через именованный (серверный) курсор и возвращает вакансии по мере
+        получения с сервера БД пакетами по itersize строк. До окончания (или прерывания) перебора
+        курсор занимает одно подключение из пула"""
+
+        with self.cursor(name=f'vacancies_{next(self.__cursor_ids)}', cursor_factory=VacancyCursor) as cur:
+            cur.itersize = itersize or self.itersize
+            cur.execute(query, params)
+            yield from cur
+
+    @timed('db_query_seconds')
     def get_all_vacancies(self) -> List[Vacancy]:
         """получает список всех вакансий с указанием названия компании,
         названия вакансии и зарплаты и ссылки на вакансию."""
 
-        with self.conn:
-            self.cur.execute(sql.SQL("SELECT vacancy_id, name, employer_id, employer_name, url, salary FROM {vacancies}"
-                                     "JOIN {employers} USING(employer_id)"
-                                     "ORDER BY salary DESC;").format(
-                vacancies=sql.Identifier(self.__vacancies_table_name),
-                employers=sql.Identifier(self.__employers_table_name)))
-            data = self.cur.fetchall()
-            vacancies = [Vacancy(*d) for d in data]
-            return vacancies
+        return self._fetch_vacancies(self._vacancies_query())
+
+    def iter_all_vacancies(self, itersize: Optional[int] = None) -> Iterator[Vacancy]:
+        """возвращает все вакансии по мере получения с сервера БД (см. get_all_vacancies)"""
+
+        return self._iter_vacancies(self._vacancies_query(), itersize=itersize)
+
+    @timed('db_query_seconds')
+    def get_vacancies_page(self, limit: int = 50, after: Optional[Tuple[int, str]] = None) -> List[Vacancy]:
+        """получает страницу из не более limit вакансий в порядке get_all_vacancies. Для получения следующей
+        страницы в after передается (зарплата, id вакансии) последней вакансии предыдущей страницы"""
 
+        if after is None:
+            return self._fetch_vacancies(sql.SQL("{query} LIMIT %s").format(query=self._vacancies_query()), (limit,))
+        query = self._vacancies_query(sql.SQL("(salary, vacancy_id) < (%s, %s)"))
+        return self._fetch_vacancies(sql.SQL("{query} LIMIT %s").format(query=query), (*after, limit))
+
+    @timed('db_query_seconds')
     def get_avg_salary(self) -> float:
-        """получает среднюю зарплату по вакансиям"""
+        """получает среднюю зарплату по вакансиям, в которых указана зарплата"""
 
-        with self.conn:
-            self.cur.execute(sql.SQL("SELECT AVG(salary) FROM {vacancies}").format(
-                vacancies=sql.Identifier(self.__vacancies_table_name)))
-            data = self.cur.fetchone()[0]
+        with self.cursor() as cur:
+            cur.execute(self._avg_salary_query())
+            data = cur.fetchone()[0]
             return round(data) if data is not None else 0
 
+    @timed('db_query_seconds')
     def get_vacancies_with_higher_salary(self) -> List[Vacancy]:
         """получает список всех вакансий, у которых зарплата выше средней по всем вакансиям"""
 
-        with self.conn:
-            self.cur.execute(sql.SQL("SELECT vacancy_id, name, employer_id, employer_name, url, salary "
-                                     "FROM {vacancies} JOIN {employers} USING(employer_id) "
-                                     "WHERE salary > (SELECT AVG(salary) FROM {vacancies}) "
-                                     "ORDER BY salary DESC;").format(
-                vacancies=sql.Identifier(self.__vacancies_table_name),
-                employers=sql.Identifier(self.__employers_table_name)))
-            data = self.cur.fetchall()
-            vacancies = [Vacancy(*d) for d in data]
-            return vacancies
+        return self._fetch_vacancies(self._higher_salary_query())
+
+    def iter_vacancies_with_higher_salary(self, itersize: Optional[int] = None) -> Iterator[Vacancy]:
+        """возвращает вакансии с зарплатой выше средней по мере получения с сервера БД"""
+
+        return self._iter_vacancies(self._higher_salary_query(), itersize=itersize)
+
+    def _avg_salary_query(self) -> sql.Composed:
+        return sql.SQL("SELECT SUM(salary_sum) / NULLIF(SUM(salary_count), 0) FROM {employer_stats}").format(
+            employer_stats=sql.Identifier(self.__employer_stats_view_name))
+
+    def _higher_salary_query(self) -> sql.Composed:
+        return self._vacancies_query(sql.SQL("salary > ({avg_salary})").format(avg_salary=self._avg_salary_query()))
 
+    @timed('db_query_seconds')
     def get_vacancies_with_keyword(self, keyword: str) -> List[Vacancy]:
-        """получает список всех вакансий, в названии которых содержатся переданные в метод слова, например python"""
-
-        with self.conn:
-            self.cur.execute(
-                sql.SQL("SELECT vacancy_id, name, employer_id, employer_name, url, salary from {vacancies} "
-                        "JOIN {employers} USING(employer_id) "
-                        "WHERE name ILIKE '%%' || %s || '%%'"
-                        "ORDER BY salary DESC;").format(
-                    vacancies=sql.Identifier(self.__vacancies_table_name),
-                    employers=sql.Identifier(self.__employers_table_name)), (keyword,))
-            data = self.cur.fetchall()
-            vacancies = [Vacancy(*d) for d in data]
-            return vacancies
+        """получает список всех вакансий, в названии которых содержатся переданные в метод слова, например python.
+
+        Поиск полнотекстовый (по индексу): вакансия подходит, если в ее названии есть все слова keyword
+        с учетом словоформ, последнее слово может быть началом слова. Вакансии упорядочены по релевантности,
+        затем по убыванию зарплаты"""
+
+        tsquery = self._keyword_tsquery(keyword)
+        if tsquery is None:
+            return []
+        return self._fetch_vacancies(self._keyword_query(), (tsquery, tsquery))
+
+    def iter_vacancies_with_keyword(self, keyword: str, itersize: Optional[int] = None) -> Iterator[Vacancy]:
+        """возвращает вакансии, найденные по словам keyword, по мере получения с сервера БД
+        (см. get_vacancies_with_keyword)"""
+
+        tsquery = self._keyword_tsquery(keyword)
+        if tsquery is None:
+            return iter([])
+        return self._iter_vacancies(self._keyword_query(), (tsquery, tsquery), itersize)
+
+    @staticmethod
+    def _keyword_tsquery(keyword: str) -> Optional[str]:
+        """преобразует строку поиска в запрос to_tsquery: слова через &, каждое слово - как префикс"""
+
+        words = re.findall(r'\w+', keyword)
+        if not words:
+            return None
+        return ' & '.join(f'{word}:*' for word in words)
+
+    def _keyword_query(self) -> sql.Composed:
+        config = sql.Literal(self.TEXT_SEARCH_CONFIG)
+        return self._vacancies_query(
+            sql.SQL("name_tsv @@ to_tsquery({config}, %s)").format(config=config),
+            sql.SQL("ts_rank(name_tsv, to_tsquery({config}, %s)) DESC, salary DESC, vacancy_id DESC").format(
+                config=config))
+
+    def _upsert(self, table: str, columns: Sequence[str], rows: Iterable[tuple], method: str):
+        """сохраняет строки в таблицу table (первая колонка - первичный ключ),
+        обновляя существующие записи, способом method"""
+
+        if method not in self.INGEST_METHODS:
+            raise ValueError(f"Неизвестный способ сохранения данных: '{method}'")
+
+        key, updated = columns[0], columns[1:]
+        target = sql.SQL("{table} ({columns})").format(table=sql.Identifier(table),
+                                                       columns=sql.SQL(', ').join(map(sql.Identifier, columns)))
+        on_conflict = sql.SQL("ON CONFLICT ({key}) DO UPDATE SET {updates}").format(
+            key=sql.Identifier(key),
+            updates=sql.SQL(', ').join(sql.SQL("{col} = EXCLUDED.{col}").format(col=sql.Identifier(c))
+                                       for c in updated))
+
+        with self.cursor() as cur:
+            if method == 'row':
+                query = sql.SQL("INSERT INTO {target} VALUES ({values}) {on_conflict};").format(
+                    target=target, values=sql.SQL(', ').join(sql.Placeholder() * len(columns)),
+                    on_conflict=on_conflict).as_string(cur)
+                for row in rows:
+                    cur.execute(query, row)
+                    metrics.inc('db_rows_written_total', table=table)
+            elif method == 'values':
+                query = sql.SQL("INSERT INTO {target} VALUES %s {on_conflict};").format(
+                    target=target, on_conflict=on_conflict).as_string(cur)
+                for batch in _batches(rows, self.batch_size):
+                    execute_values(cur, query, batch, page_size=len(batch))
+                    metrics.inc('db_rows_written_total', len(batch), table=table)
+            else:
+                staging = sql.Identifier(f'{table}_staging')
+                cur.execute(sql.SQL("CREATE TEMP TABLE IF NOT EXISTS {staging} "
+                                    "(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP;").format(
+                    staging=staging, table=sql.Identifier(table)))
+                copy = sql.SQL("COPY {staging} ({columns}) FROM STDIN").format(
+                    staging=staging, columns=sql.SQL(', ').join(map(sql.Identifier, columns))).as_string(cur)
+                merge = sql.SQL("INSERT INTO {target} SELECT {columns} FROM {staging} {on_conflict};").format(
+                    target=target, columns=sql.SQL(', ').join(map(sql.Identifier, columns)),
+                    staging=staging, on_conflict=on_conflict).as_string(cur)
+                truncate = sql.SQL("TRUNCATE {staging};").format(staging=staging).as_string(cur)
+                for batch in _batches(rows, self.batch_size):
+                    data = ''.join('\t'.join(map(_copy_value, row)) + '\n' for row in batch)
+                    buffer = io.StringIO(data)
+                    cur.copy_expert(copy, buffer)
+                    cur.execute(merge)
+                    cur.execute(truncate)
+                    metrics.inc('db_rows_written_total', len(batch), table=table)
+                    metrics.inc('db_copy_bytes_total', len(data.encode()), table=table)
+
+    @timed('db_query_seconds')
+    def save_companies(self, companies: List[dict], method: str = 'values', refresh: bool = True):
+        """Сохраняет список компаний в базу данных.
+        Если refresh=False, статистика по компаниям не обновляется (см. refresh_stats)"""
+
+        self._upsert(self.__employers_table_name, ('employer_id', 'employer_name'),
+                     ((list(c.keys())[0], list(c.values())[0]) for c in companies), method)
+        if refresh:
+            self.refresh_stats()
+
+    @timed('db_query_seconds')
+    def save_vacancies(self, vacancies: Iterable[Vacancy], method: str = 'values', refresh: bool = True):
+        """Сохраняет список вакансий в базу данных (ранее перенесенные в архив вакансии становятся активными).
+        Если refresh=False, статистика по компаниям не обновляется (см. refresh_stats)"""
+
+        self._upsert(self.__vacancies_table_name,
+                     ('vacancy_id', 'name', 'employer_id', 'url', 'salary_from', 'salary_to', 'published_at',
+                      'archived'),
+                     ((v.vacancy_id, v.name, v.employer_id, v.url, v.salary or None, v.salary_to, v.published_at,
+                       False) for v in vacancies), method)
+        if refresh:
+            self.refresh_stats()
+
+    @timed('db_query_seconds')
+    def export_snapshot(self, directory: str) -> Dict[str, int]:
+        """Сохраняет компании и вакансии (включая перенесенные в архив) в колоночный снимок в каталоге directory
+        (см. src.snapshot.Snapshot). Данные выгружаются через COPY TO в одной транзакции, поэтому снимок
+        согласован. Колонки записываются в файлы по мере выгрузки (размеры файлов определяются заранее в той же
+        транзакции), поэтому таблицы целиком в памяти не хранятся.
+        Возвращает количество сохраненных строк каждой таблицы. Требуется пакет numpy"""
+
+        # снимки требуют numpy, поэтому модуль импортируется только при использовании
+        from src.snapshot import SnapshotFileWriter, write_meta
+
+        tables = {'employers': self.__employers_table_name, 'vacancies': self.__vacancies_table_name}
+        os.makedirs(directory, exist_ok=True)
+        meta = {}
+        with self.cursor() as cur:
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;")
+            for table, columns in self.SNAPSHOT_COLUMNS.items():
+                expressions = [
+                    sql.SQL("(EXTRACT(EPOCH FROM {column}) * 1000000)::BIGINT").format(column=sql.Identifier(name))
+                    if column_type == 'datetime' else sql.Identifier(name)
+                    for name, column_type in columns.items()]
+                string_columns = [name for name, column_type in columns.items() if column_type == 'str']
+                cur.execute(sql.SQL("SELECT COUNT(*){sizes} FROM {table}").format(
+                    sizes=sql.SQL('').join(sql.SQL(", COALESCE(SUM(OCTET_LENGTH({column})), 0)").format(
+                        column=sql.Identifier(name)) for name in string_columns),
+                    table=sql.Identifier(tables[table])))
+                rows, *sizes = cur.fetchone()
+                writer = SnapshotFileWriter(directory, table, columns, rows, dict(zip(string_columns, sizes)))
+                cur.copy_expert(sql.SQL("COPY (SELECT {columns} FROM {table}) TO STDOUT").format(
+                    columns=sql.SQL(', ').join(expressions), table=sql.Identifier(tables[table])).as_string(cur),
+                    writer)
+                meta[table] = writer.save()
+                metrics.inc('db_rows_exported_total', writer.rows, table=tables[table])
+        write_meta(directory, meta)
+        return {table: table_meta['rows'] for table, table_meta in meta.items()}
+
+    @timed('db_query_seconds')
+    def import_snapshot(self, directory: str, method: str = 'copy', refresh: bool = True) -> Dict[str, int]:
+        """Сохраняет в базу данных компании и вакансии из снимка в каталоге directory (см. export_snapshot),
+        обновляя существующие записи, способом method. Возвращает количество загруженных строк каждой таблицы.
+        Если refresh=False, статистика по компаниям не обновляется (см. refresh_stats)"""
+
+        from src.snapshot import Snapshot
+
+        snapshot = Snapshot(directory)
+        tables = {'employers': self.__employers_table_name, 'vacancies': self.__vacancies_table_name}
+        for table, columns in self.SNAPSHOT_COLUMNS.items():
+            self._upsert(tables[table], list(columns), snapshot.iter_rows(table, list(columns), self.batch_size),
+                         method)
+        if refresh:
+            self.refresh_stats()
+        return {table: snapshot.rows(table) for table in self.SNAPSHOT_COLUMNS}
+
+    @timed('db_query_seconds')
+    def get_salary_arrays(self, keyword: Optional[str] = None) -> Tuple[List[dict], Dict[str, 'np.ndarray']]:
+        """Получает одной выгрузкой (COPY TO) зарплаты активных вакансий, в которых указана зарплата; если задан
+        keyword - только вакансий, найденных по словам keyword (см. get_vacancies_with_keyword).
+        Возвращает список компаний [{'employer_id': ..., 'company_name': ...}] и массивы NumPy: 'employer' - номер
+        компании вакансии в этом списке, 'salary_from' и 'salary_to' (NaN, если не указана). Требуется пакет numpy"""
+
+        from src.snapshot import SnapshotTableWriter
+
+        condition = sql.SQL('TRUE')
+        if keyword is not None:
+            tsquery = self._keyword_tsquery(keyword)
+            condition = sql.SQL("name_tsv @@ to_tsquery({config}, {tsquery})").format(
+                config=sql.Literal(self.TEXT_SEARCH_CONFIG), tsquery=sql.Literal(tsquery)) if tsquery \
+                else sql.SQL('FALSE')
+        writer = SnapshotTableWriter({'employer': 'int', 'salary_from': 'int', 'salary_to': 'int'})
+        with self.cursor() as cur:
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;")
+            cur.execute(sql.SQL("SELECT employer_id, employer_name FROM {employers} ORDER BY employer_id").format(
+                employers=sql.Identifier(self.__employers_table_name)))
+            employers = [{'employer_id': d[0], 'company_name': d[1]} for d in cur.fetchall()]
+            cur.copy_expert(sql.SQL(
+                "COPY (SELECT codes.code, salary_from, salary_to FROM {vacancies} "
+                "JOIN (SELECT employer_id, ROW_NUMBER() OVER (ORDER BY employer_id) - 1 AS code FROM {employers}) "
+                "AS codes USING(employer_id) "
+                "WHERE NOT archived AND salary_from IS NOT NULL AND ({condition})) TO STDOUT").format(
+                vacancies=sql.Identifier(self.__vacancies_table_name),
+                employers=sql.Identifier(self.__employers_table_name),
+                condition=condition).as_string(cur), writer)
+        arrays = writer.arrays()
+        arrays['employer'] = arrays['employer'].astype('int64')
+        return employers, arrays
+
+    @timed('db_query_seconds')
+    def get_sync_state(self) -> Dict[str, datetime]:
+        """получает время последней синхронизации вакансий каждой компании"""
+
+        with self.cursor() as cur:
+            cur.execute(sql.SQL("SELECT employer_id, synced_at FROM {sync_state}").format(
+                sync_state=sql.Identifier(self.__sync_state_table_name)))
+            return dict(cur.fetchall())
+
+    @timed('db_query_seconds')
+    def get_skipped_counts(self) -> Dict[str, int]:
+        """получает количество вакансий каждой компании в выдаче поиска, не сохраненных в БД,
+        на момент последней синхронизации (компании, для которых оно неизвестно, не включаются)"""
+
+        with self.cursor() as cur:
+            cur.execute(sql.SQL("SELECT employer_id, skipped FROM {sync_state} WHERE skipped IS NOT NULL").format(
+                sync_state=sql.Identifier(self.__sync_state_table_name)))
+            return dict(cur.fetchall())
+
+    @timed('db_query_seconds')
+    def save_sync_state(self, sync_state: Dict[str, datetime], skipped: Optional[Dict[str, int]] = None):
+        """Сохраняет время последней синхронизации вакансий компаний и количество вакансий компаний в выдаче
+        поиска, не сохраненных в БД (skipped; для компаний, которых нет в skipped, оно становится неизвестным)"""
+
+        skipped = skipped or {}
+        self._upsert(self.__sync_state_table_name, ('employer_id', 'synced_at', 'skipped'),
+                     ((employer_id, synced_at, skipped.get(employer_id))
+                      for employer_id, synced_at in sync_state.items()), 'values')
+
+    @timed('db_query_seconds')
+    def count_active_vacancies(self) -> Dict[str, int]:
+        """получает количество активных (не перенесенных в архив) вакансий каждой компании"""
+
+        with self.cursor() as cur:
+            cur.execute(sql.SQL("SELECT employer_id, COUNT(*) FROM {vacancies} WHERE NOT archived "
+                                "GROUP BY employer_id").format(
+                vacancies=sql.Identifier(self.__vacancies_table_name)))
+            return dict(cur.fetchall())
+
+    @timed('db_query_seconds')
+    def archive_missing_vacancies(self, employer_id: str, vacancy_ids: Iterable[str], refresh: bool = True) -> int:
+        """переносит в архив активные вакансии компании employer_id, id которых нет в vacancy_ids;
+        возвращает количество перенесенных вакансий. Если refresh=False, статистика по компаниям не обновляется"""
+
+        with self.cursor() as cur:
+            cur.execute(sql.SQL("UPDATE {vacancies} SET archived = TRUE "
+                                "WHERE employer_id = %s AND NOT archived "
+                                "AND vacancy_id <> ALL(%s::VARCHAR[]);").format(
+                vacancies=sql.Identifier(self.__vacancies_table_name)), (employer_id, list(vacancy_ids)))
+            archived = cur.rowcount
+        if refresh:
+            self.refresh_stats()
+        return archived
+
+    @timed('db_query_seconds')
+    def archive_expired_vacancies(self, published_before: datetime, exclude_ids: Iterable[str] = (),
+                                  exclude_employers: Iterable[str] = (), refresh: bool = True) -> int:
+        """переносит в архив активные вакансии, опубликованные раньше published_before, кроме вакансий,
+        id которых есть в exclude_ids, и вакансий компаний из exclude_employers;
+        возвращает количество перенесенных вакансий. Если refresh=False, статистика по компаниям не обновляется"""
 
-    def save_companies(self, companies: List[dict]):
-        """Сохраняет список компаний в базу данных"""
-
-        with self.conn:
-            for c in companies:
-                self.cur.execute(sql.SQL("INSERT INTO {employers} (employer_id, employer_name) "
-                                         "VALUES (%s, %s)  "
-                                         "ON CONFLICT (employer_id) "
-                                         "DO UPDATE SET employer_name = EXCLUDED.employer_name;").format(
-                    employers=sql.Identifier(self.__employers_table_name)), (list(c.keys())[0], list(c.values())[0]))
-
-    def save_vacancies(self, vacancies: List[Vacancy]):
-        """Сохраняет список вакансий в базу данных"""
-
-        with self.conn:
-            for v in vacancies:
-                query = sql.SQL("INSERT INTO {vacancies} (vacancy_id, name, employer_id, url, salary) "
-                                "VALUES (%s, %s, %s, %s, %s)  "
-                                "ON CONFLICT (vacancy_id) "
-                                "DO UPDATE SET (name, employer_id, url, salary) = "
-                                "(excluded.name, excluded.employer_id, excluded.url, excluded.salary);").format(
-                    vacancies=sql.Identifier(self.__vacancies_table_name))
-
-                self.cur.execute(query, (v.vacancy_id, v.name, v.employer_id, v.url, v.salary))
+        with self.cursor() as cur:
+            cur.execute(sql.SQL("UPDATE {vacancies} SET archived = TRUE "
+                                "WHERE NOT archived AND published_at < %s "
+                                "AND vacancy_id <> ALL(%s::VARCHAR[]) "
+                                "AND COALESCE(employer_id <> ALL(%s::VARCHAR[]), TRUE);").format(
+                vacancies=sql.Identifier(self.__vacancies_table_name)),
+                (published_before, list(exclude_ids), list(exclude_employers)))
+            archived = cur.rowcount
+        if refresh:
+            self.refresh_stats()
+        return archived
@@ -1,58 +1,172 @@
-import copy
-import json
-from typing import List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
 
 import requests
-from colorama import Fore, Style
+from requests.adapters import HTTPAdapter
 
+from src import hh_json
+from src.hh_json import VacancyPage
+from src.http_cache import CachedResponse, ResponseCache
+from src.metrics import metrics
+from src.throttle import RetryPolicy, TokenBucket
 from src.vacancy import Vacancy
 
 
+class HHAPIError(Exception):
+    """Ошибка получения данных с сервера HeadHunter"""
+
+
+def salary_in_rur_or_none(vacancy: dict) -> bool:
+    """проверяет, что зарплата в вакансии указана в рублях, либо не указана"""
+
+    salary = vacancy.get('salary')
+    if salary:
+        return salary.get('currency') == 'RUR'
+    return True
+
+
 class HeadHunterAPI:
     """
-        Класс для работы с API HeadHunter
+        Класс для работы с API HeadHunter.
+        Запросы выполняются через одну сессию (keep-alive). Если задан кэш ответов cache, свежие ответы берутся
+        из кэша без запроса к серверу, а устаревшие проверяются условным запросом (ответ 304 - не изменился).
+        Частота запросов ограничивается rate_limiter, неудачные запросы страниц повторяются по правилам retry_policy
     """
 
     __base_url: str
     __headers: dict
     __params: dict
-    __vacancies: list
+    __session: requests.Session
 
-    def __init__(self):
-        self.__base_url = 'https://api.hh.ru/vacancies'
+    def __init__(self, base_url: str = 'https://api.hh.ru/vacancies', max_workers: int = 4, timeout: float = 10,
+                 cache: Optional[ResponseCache] = None, rate_limiter: Optional[TokenBucket] = None,
+                 retry_policy: Optional[RetryPolicy] = None):
+        self.__base_url = base_url
         self.__headers = {'User-Agent': 'HH-User-Agent'}
         self.__params = {'text': '', 'page': 0, 'per_page': 100}
-        self.__vacancies = []
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache = cache
+        self.rate_limiter = rate_limiter or TokenBucket(capacity=max(max_workers, 1))
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.__session = requests.Session()
+        self.__session.headers.update(self.__headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(max_workers, 1))
+        self.__session.mount('http://', adapter)
+        self.__session.mount('https://', adapter)
 
-    def get_vacancies(self, employers: List[dict]) -> list:
-        """возвращает список вакансий, опубликованных заданными компаниями (из списка employers),
-        с зарплатой в рублях, либо с неуказанным значением зарплаты"""
+    @property
+    def params(self) -> dict:
+        """параметры поискового запроса по умолчанию"""
 
-        def salary_in_rur_or_none(vacancy: dict) -> bool:
-            salary = vacancy.get('salary')
-            if salary:
-                return salary.get('currency') == 'RUR'
-            return True
+        return dict(self.__params)
 
-        self.__vacancies.clear()
-        self.__params['employer_id'] = list([list(e.keys())[0] for e in employers])
-        self.__params['page'] = 0
-        pages = 20
-        while self.__params.get('page') < pages:
+    def _fetch_page(self, params: dict, page: int) -> bytes:
+        """возвращает тело ответа сервера со страницей page результатов поиска вакансий с параметрами params.
+
+        При истечении времени ожидания, ошибке соединения или чтения ответа, а также при ответе 429/5xx
+        запрос страницы повторяется по правилам retry_policy; если страницу так и не удалось получить, выбрасывается HHAPIError"""
+
+        params = dict(params, page=page)
+        cache_key = cached = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(self.__base_url, params)
+            cached = self.cache.get(cache_key)
+            if cached is not None and self.cache.is_fresh(cached):
+                metrics.inc('hh_cache_hits_total')
+                return cached.body
+
+        for attempt in range(self.retry_policy.retries + 1):
+            self.rate_limiter.acquire()
+            retry_after = None
+            if attempt:
+                metrics.inc('hh_retries_total')
             try:
-                response = requests.get(self.__base_url, headers=self.__headers, params=self.__params, timeout=1)
-            except requests.exceptions.Timeout as e:
-                print(f"{Fore.YELLOW}Истекло время ожидания ответа сервера. Попробуйте позже.")  # todo: уточнить
-                # бизнес-логику
-                print(Style.RESET_ALL)
-                return copy.deepcopy(self.__vacancies)
+                with metrics.timer('hh_request_seconds'):
+                    response = self.__session.get(self.__base_url, params=params, timeout=self.timeout,
+                                                  headers=cached.validators if cached is not None else None)
+                    # тело читается здесь же, чтобы обрыв соединения или ошибка распаковки при чтении тела
+                    # тоже приводили к повтору запроса
+                    body = response.content
+            except requests.exceptions.RequestException as e:
+                metrics.inc('hh_requests_total', status='error')
+                error = f"ошибка запроса: {e}"
             else:
+                metrics.inc('hh_requests_total', status=response.status_code)
+                metrics.inc('hh_response_bytes_total', len(body))
+                if response.status_code == 304 and cached is not None:
+                    self.rate_limiter.on_success()
+                    self.cache.set(cache_key, CachedResponse(cached.body, cached.etag, cached.last_modified))
+                    return cached.body
                 if response.status_code == 200:
-                    response_json = response.json()
-                    pages = response_json['pages']
-                    vacancies = filter(salary_in_rur_or_none, response_json['items'])
-                    self.__vacancies.extend(vacancies)
-                    self.__params['page'] += 1
-                else:  # todo: уточнить бизнес-логику
-                    return copy.deepcopy(self.__vacancies)
-        return copy.deepcopy(self.__vacancies)
+                    self.rate_limiter.on_success()
+                    if self.cache is not None and 'no-store' not in response.headers.get('Cache-Control', ''):
+                        self.cache.set(cache_key, CachedResponse(body, response.headers.get('ETag'),
+                                                                 response.headers.get('Last-Modified')))
+                    return body
+                error = f"ответ сервера {response.status_code}"
+                if response.status_code not in self.retry_policy.RETRY_STATUSES:
+                    raise HHAPIError(f"Не удалось получить страницу {page}: {error}")
+                self.rate_limiter.on_throttle()
+                retry_after = response.headers.get('Retry-After')
+            if attempt < self.retry_policy.retries:
+                time.sleep(self.retry_policy.delay(attempt, retry_after))
+        raise HHAPIError(f"Не удалось получить страницу {page} "
+                         f"после {self.retry_policy.retries + 1} попыток: {error}")
+
+    def get_page(self, params: dict, page: int) -> dict:
+        """возвращает страницу page результатов поиска вакансий с параметрами params в виде словаря
+        (см. _fetch_page)"""
+
+        body = self._fetch_page(params, page)
+        with metrics.timer('hh_decode_seconds'):
+            try:
+                return hh_json.loads(body)
+            except ValueError as e:
+                raise HHAPIError(f"Некорректный ответ сервера на запрос страницы {page}: {e}")
+
+    def get_vacancies_page(self, params: dict, page: int) -> VacancyPage:
+        """возвращает страницу page результатов поиска вакансий с параметрами params: объекты вакансий
+        с зарплатой в рублях, либо с неуказанным значением зарплаты, создаются сразу при разборе ответа
+        (см. hh_json.decode_vacancies_page)"""
+
+        body = self._fetch_page(params, page)
+        with metrics.timer('hh_decode_seconds'):
+            try:
+                vacancies_page = hh_json.decode_vacancies_page(body)
+            except (ValueError, KeyError, TypeError) as e:
+                raise HHAPIError(f"Некорректный ответ сервера на запрос страницы {page}: {e}")
+        metrics.inc('vacancies_parsed_total', len(vacancies_page.items))
+        return vacancies_page
+
+    def iter_pages(self, employers: List[dict], concurrent: bool = True) -> Iterator[List[dict]]:
+        """возвращает по мере получения страницы списка вакансий, опубликованных заданными компаниями
+        (из списка employers), с зарплатой в рублях, либо с неуказанным значением зарплаты.
+
+        Первая страница запрашивается отдельно, чтобы узнать общее количество страниц. Если concurrent=True,
+        остальные страницы запрашиваются параллельно (не более max_workers запросов одновременно),
+        страницы возвращаются в порядке номеров."""
+
+        self.__params['employer_id'] = list([list(e.keys())[0] for e in employers])
+        params = dict(self.__params)
+
+        first_page = self.get_page(params, 0)
+        yield list(filter(salary_in_rur_or_none, first_page['items']))
+
+        pages = range(1, first_page['pages'])
+        if concurrent and self.max_workers > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                responses = executor.map(lambda page: self.get_page(params, page), pages)
+                for response_json in responses:
+                    yield list(filter(salary_in_rur_or_none, response_json['items']))
+        else:
+            for page in pages:
+                response_json = self.get_page(params, page)
+                yield list(filter(salary_in_rur_or_none, response_json['items']))
+
+    def get_vacancies(self, employers: List[dict], concurrent: bool = True) -> list:
+        """возвращает список вакансий, опубликованных заданными компаниями (из списка employers),
+        с зарплатой в рублях, либо с неуказанным значением зарплаты"""
+
+        return [vacancy for page in self.iter_pages(employers, concurrent) for vacancy in page]
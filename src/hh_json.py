@@ -0,0 +1,122 @@
+import json
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Union
+
+from src.vacancy import Vacancy
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class VacancyPage(NamedTuple):
+    """Страница результатов поиска: вакансии с зарплатой в рублях (либо с неуказанной зарплатой),
+    общее количество найденных вакансий и количество страниц"""
+
+    items: List[Vacancy]
+    found: int
+    pages: int
+
+
+def _vacancies_from_dicts(items: Iterable[dict]) -> List[Vacancy]:
+    """создает объекты вакансий из словарей, пропуская вакансии с зарплатой не в рублях и вакансии без
+    идентификатора или названия работодателя. Пустая зарплата ({} или null) считается неуказанной"""
+
+    vacancies = []
+    for v in items:
+        salary = v.get('salary')
+        if salary:
+            if salary.get('currency') != 'RUR':
+                continue
+            salary_from, salary_to = salary.get('from'), salary.get('to')
+        else:
+            salary_from = salary_to = None
+        employer = v.get('employer') or {}
+        employer_id, employer_name = employer.get('id'), employer.get('name')
+        if employer_id is None or employer_name is None:
+            continue
+        vacancies.append(Vacancy(v['id'], v['name'], employer_id, employer_name, v.get('url'),
+                                 salary_from, v.get('published_at'), salary_to))
+    return vacancies
+
+
+def _decode_page_json(body: bytes) -> VacancyPage:
+    page = json.loads(body)
+    return VacancyPage(_vacancies_from_dicts(page['items']), page.get('found', 0), page.get('pages', 1))
+
+
+BACKENDS: Dict[str, Callable[[bytes], VacancyPage]] = {'json': _decode_page_json}
+loads: Callable[[bytes], object] = json.loads
+
+if orjson is not None:
+    def _decode_page_orjson(body: bytes) -> VacancyPage:
+        page = orjson.loads(body)
+        return VacancyPage(_vacancies_from_dicts(page['items']), page.get('found', 0), page.get('pages', 1))
+
+    BACKENDS['orjson'] = _decode_page_orjson
+    loads = orjson.loads
+
+if msgspec is not None:
+    # отсутствующие поля зарплаты отличаются от null, чтобы пустая зарплата {} считалась неуказанной, как в json
+    class _Salary(msgspec.Struct):
+        from_: Union[Optional[int], msgspec.UnsetType] = msgspec.field(default=msgspec.UNSET, name='from')
+        to: Union[Optional[int], msgspec.UnsetType] = msgspec.UNSET
+        currency: Union[Optional[str], msgspec.UnsetType] = msgspec.UNSET
+
+    _EMPTY_SALARY = _Salary()
+
+    class _Employer(msgspec.Struct):
+        id: Optional[str] = None
+        name: Optional[str] = None
+
+    class _Item(msgspec.Struct):
+        id: str
+        name: str
+        employer: Optional[_Employer] = None
+        url: Optional[str] = None
+        salary: Optional[_Salary] = None
+        published_at: Optional[str] = None
+
+    class _Page(msgspec.Struct):
+        items: List[_Item]
+        found: int = 0
+        pages: int = 1
+
+    # поля, которых нет в структурах, пропускаются без создания объектов Python
+    _page_decoder = msgspec.json.Decoder(_Page, strict=False)
+
+    def _decode_page_msgspec(body: bytes) -> VacancyPage:
+        page = _page_decoder.decode(body)
+        vacancies = []
+        for v in page.items:
+            salary, employer = v.salary, v.employer
+            if salary is None or salary == _EMPTY_SALARY:
+                salary_from = salary_to = None
+            elif salary.currency != 'RUR':
+                continue
+            else:
+                salary_from = None if salary.from_ is msgspec.UNSET else salary.from_
+                salary_to = None if salary.to is msgspec.UNSET else salary.to
+            if employer is None or employer.id is None or employer.name is None:
+                continue
+            vacancies.append(Vacancy(v.id, v.name, employer.id, employer.name, v.url,
+                                     salary_from, v.published_at, salary_to))
+        return VacancyPage(vacancies, page.found, page.pages)
+
+    BACKENDS['msgspec'] = _decode_page_msgspec
+    loads = msgspec.json.decode
+
+# самый быстрый из установленных способов разбора: msgspec, orjson или стандартный модуль json
+BACKEND = next(name for name in ('msgspec', 'orjson', 'json') if name in BACKENDS)
+
+
+def decode_vacancies_page(body: bytes) -> VacancyPage:
+    """разбирает тело ответа сервера со страницей результатов поиска вакансий: извлекаются только сохраняемые
+    поля вакансий, вакансии с зарплатой не в рублях и без идентификатора или названия работодателя пропускаются. При некорректном ответе выбрасывается ValueError"""
+
+    return BACKENDS[BACKEND](body)
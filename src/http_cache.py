@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+from urllib.parse import urlencode
+
+
+class CachedResponse:
+    """Сохраненный ответ сервера: тело ответа, заголовки для условного запроса и время сохранения"""
+
+    __slots__ = ('body', 'etag', 'last_modified', 'stored_at')
+
+    def __init__(self, body: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                 stored_at: Optional[float] = None):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = time.time() if stored_at is None else stored_at
+
+    @property
+    def validators(self) -> dict:
+        """заголовки условного запроса, на который сервер ответит 304, если ответ не изменился"""
+
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache(ABC):
+    """Базовый класс кэша ответов сервера. Ответ считается свежим в течение ttl секунд после сохранения,
+    устаревший ответ используется для условного запроса (If-None-Match/If-Modified-Since)"""
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(url: str, params: dict) -> str:
+        """возвращает ключ кэша для запроса url с параметрами params (порядок параметров не важен)"""
+
+        query = urlencode(sorted((k, v) for k, values in params.items()
+                                 for v in (values if isinstance(values, (list, tuple)) else [values])))
+        return hashlib.sha256(f'{url}?{query}'.encode('utf-8')).hexdigest()
+
+    def is_fresh(self, response: CachedResponse) -> bool:
+        return time.time() - response.stored_at < self.ttl
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """возвращает сохраненный ответ с ключом key или None, если его нет в кэше"""
+
+    @abstractmethod
+    def set(self, key: str, response: CachedResponse):
+        """сохраняет ответ с ключом key"""
+
+
+class DiskResponseCache(ResponseCache):
+    """Кэш ответов сервера в каталоге directory: по файлу на ответ. Если суммарный размер файлов превышает
+    max_size байт, удаляются ответы, которые дольше всего не использовались (LRU), пока размер не станет
+    не больше EVICT_RATIO * max_size. Суммарный размер файлов отслеживается при сохранении ответов,
+    каталог просматривается целиком только при вытеснении"""
+
+    EVICT_RATIO = 0.9
+
+    def __init__(self, directory: str, ttl: float = 300, max_size: int = 100 * 1024 * 1024):
+        super().__init__(ttl)
+        self.directory = directory
+        self.max_size = max_size
+        self.__lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.__total_size = sum(size for _, size, _ in self._entries())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.cache')
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+            # время изменения файла - время последнего использования ответа для вытеснения LRU
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return CachedResponse(body, meta.get('etag'), meta.get('last_modified'), meta['stored_at'])
+
+    def set(self, key: str, response: CachedResponse):
+        meta = {'etag': response.etag, 'last_modified': response.last_modified, 'stored_at': response.stored_at}
+        data = json.dumps(meta).encode('utf-8') + b'\n'
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.write(response.body)
+            with self.__lock:
+                try:
+                    replaced_size = os.stat(path).st_size
+                except FileNotFoundError:
+                    replaced_size = 0
+                os.replace(tmp_path, path)
+                self.__total_size += len(data) + len(response.body) - replaced_size
+                evict = self.__total_size > self.max_size
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if evict:
+            self._evict()
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """возвращает (время последнего использования, размер, путь) файлов ответов"""
+
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.cache'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self):
+        """удаляет дольше всего не использовавшиеся ответы, пока размер кэша больше EVICT_RATIO * max_size"""
+
+        with self.__lock:
+            entries = self._entries()
+            # размер пересчитывается по файлам: каталог мог изменяться и другими процессами
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_size <= self.max_size * self.EVICT_RATIO:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total_size -= size
+            self.__total_size = total_size
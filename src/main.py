@@ -1,31 +1,32 @@
+import argparse
 import os
 
 from colorama import Fore, Style
 from dotenv import load_dotenv
 
-from src.dbmanager import DBManager
+from src.config import DEFAULT_CACHE_DIR, DEFAULT_COMPANIES_PATH, load_db_config
+from src.dbmanager import DBManager, DBManagerError
 from src.hh_api import HeadHunterAPI
-from src.utils import print_menu, print_vacancies_by_keyword, print_companies, print_all_vacancies, load_companies
-from src.vacancy import Vacancy
+from src.http_cache import DiskResponseCache
+from src.metrics import profiling, write_metrics
+from src.sync import sync_vacancies
+from src.utils import print_menu, print_vacancies_by_keyword, print_companies, print_all_vacancies, load_companies, \
+    print_vacancies_with_higher_salary, print_salary_distribution, print_employer_salary_distribution, \
+    print_keyword_salary_stats
 
 
-def main():
+def run_interactive():
     if not load_dotenv():
         print(f"{Fore.RED}Не найден файл с настройками подключения к БД: '.env'")
         print(Style.RESET_ALL)
         exit()
 
-    db_config = {
-        'dbname': os.getenv('POSTGRES_DB'),
-        'user': os.getenv('POSTGRES_USER'),
-        'password': os.getenv('POSTGRES_PASSWORD'),
-        'host': os.getenv('POSTGRES_HOST', 'localhost'),
-        'port': os.getenv('POSTGRES_PORT', '5432')
-    }
+    db_config = load_db_config()
 
-    hh_api = HeadHunterAPI()
+    cache_dir = os.getenv('HH_CACHE_DIR', DEFAULT_CACHE_DIR)
+    hh_api = HeadHunterAPI(cache=DiskResponseCache(cache_dir, ttl=int(os.getenv('HH_CACHE_TTL', '300'))))
 
-    path = os.path.join(f"..{os.sep}data", "companies.json")
+    path = DEFAULT_COMPANIES_PATH
     try:
         companies = load_companies(path)
     except FileNotFoundError as e:
@@ -45,17 +46,22 @@ def main():
             {"5724503": "Amex Development"}
         ]
 
-    print(f"\n{Fore.GREEN}Получение вакансий с сервера. Пожалуйста, подождите.")
-    print(Style.RESET_ALL)
-    hh_vacancies = hh_api.get_vacancies(companies)
-
-    vacancies_list = Vacancy.cast_to_object_list(hh_vacancies)
+    try:
+        db = DBManager(db_config)
+    except DBManagerError as e:
+        print(f"{Fore.RED}{e}")
+        print(Style.RESET_ALL)
+        exit()
 
-    with DBManager(db_config) as db:
-        print(f"{Fore.GREEN}Сохранение вакансий в базу данных. Пожалуйста, подождите.")
+    with db:
+        print(f"\n{Fore.GREEN}Синхронизация вакансий с сервером. Пожалуйста, подождите.")
         print(Style.RESET_ALL)
-        db.save_companies(companies)
-        db.save_vacancies(vacancies_list)
+        result = sync_vacancies(hh_api, db, companies, on_progress=lambda shard, fetched, found: print(
+            f"Компания {shard.employer_id}: получено {fetched} из {found} вакансий"))
+        print(f"Получено вакансий: {result['fetched']}, перенесено в архив: {result['archived']}")
+        if result['failed']:
+            print(f"{Fore.YELLOW}Не удалось получить часть вакансий компаний: {', '.join(result['failed'])}")
+            print(Style.RESET_ALL)
 
         while True:
             user_input = print_menu().strip()
@@ -71,6 +77,32 @@ def main():
                 print_all_vacancies(db)
             elif user_input == '5':
                 break
+            elif user_input == '6':
+                print_vacancies_with_higher_salary(db)
+            elif user_input in ('7', '8', '9'):
+                print_analytics = {'7': print_salary_distribution, '8': print_employer_salary_distribution,
+                                   '9': print_keyword_salary_stats}[user_input]
+                try:
+                    print_analytics(db)
+                except ImportError as e:
+                    print(f"{Fore.YELLOW}{e}")
+                    print(Style.RESET_ALL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Вакансии компаний с hh.ru в базе данных PostgreSQL")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="сохранить метрики работы в файл (.prom - формат Prometheus, иначе JSON)")
+    parser.add_argument('--profile', metavar='FILE', help="профилировать (cProfile) и сохранить статистику в файл")
+    parser.add_argument('--tracemalloc', action='store_true', help="вывести места наибольшего выделения памяти")
+    args = parser.parse_args()
+
+    try:
+        with profiling(args.profile, args.tracemalloc):
+            run_interactive()
+    finally:
+        if args.metrics:
+            write_metrics(args.metrics)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,173 @@
+import bisect
+import cProfile
+import functools
+import json
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence, TextIO, Tuple
+
+# границы интервалов гистограмм длительности, в секундах
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    """Гистограмма наблюдаемых значений с фиксированными границами интервалов buckets"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self) -> dict:
+        return {'buckets': dict(zip([*map(str, self.buckets), '+Inf'], self.counts)),
+                'sum': self.sum, 'count': self.count}
+
+
+class Metrics:
+    """Реестр метрик: счетчики (inc) и гистограммы (observe, timer) с метками.
+    Метрики можно выгрузить в JSON (to_json) или в текстовом формате Prometheus (to_prometheus)"""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__counters: Dict[Tuple[str, tuple], float] = {}
+        self.__histograms: Dict[Tuple[str, tuple], Histogram] = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> Tuple[str, tuple]:
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """увеличивает счетчик name на value"""
+
+        key = self._key(name, labels)
+        with self.__lock:
+            self.__counters[key] = self.__counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """добавляет значение value в гистограмму name"""
+
+        key = self._key(name, labels)
+        with self.__lock:
+            histogram = self.__histograms.get(key)
+            if histogram is None:
+                histogram = self.__histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """добавляет длительность выполнения блока with (в секундах) в гистограмму name"""
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self.__lock:
+            self.__counters.clear()
+            self.__histograms.clear()
+
+    def to_dict(self) -> dict:
+        with self.__lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self.__counters.items())]
+            histograms = [{'name': name, 'labels': dict(labels), **histogram.to_dict()}
+                          for (name, labels), histogram in sorted(self.__histograms.items())]
+        return {'counters': counters, 'histograms': histograms}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self) -> str:
+        """возвращает метрики в текстовом формате Prometheus"""
+
+        def format_labels(labels: tuple, extra: tuple = ()) -> str:
+            items = [*labels, *extra]
+            if not items:
+                return ''
+            return '{' + ','.join(f'{k}="{v}"' for k, v in items) + '}'
+
+        lines, typed = [], set()
+        with self.__lock:
+            counters = sorted(self.__counters.items())
+            histograms = sorted(self.__histograms.items())
+            for (name, labels), value in counters:
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f'# TYPE {name} counter')
+                lines.append(f'{name}{format_labels(labels)} {value}')
+            for (name, labels), histogram in histograms:
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f'# TYPE {name} histogram')
+                cumulative = 0
+                for bound, count in zip([*map(str, histogram.buckets), '+Inf'], histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{format_labels(labels, (("le", bound),))} {cumulative}')
+                lines.append(f'{name}_sum{format_labels(labels)} {histogram.sum}')
+                lines.append(f'{name}_count{format_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+# реестр метрик приложения
+metrics = Metrics()
+
+
+def timed(name: str):
+    """декоратор: добавляет длительность вызова метода в гистограмму name с меткой method"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.timer(name, method=func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def write_metrics(path: str):
+    """сохраняет метрики в файл path: в текстовом формате Prometheus, если расширение файла .prom, иначе в JSON"""
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(metrics.to_prometheus() if path.endswith('.prom') else metrics.to_json())
+
+
+@contextmanager
+def profiling(profile_path: Optional[str] = None, trace_memory: bool = False, top: int = 20,
+              stream: Optional[TextIO] = None):
+    """профилирует блок with: если задан profile_path, сохраняет в него статистику cProfile
+    и выводит top самых долгих функций; если trace_memory=True, выводит top мест выделения памяти (tracemalloc).
+    Результаты выводятся в stream (по умолчанию - стандартный вывод)"""
+
+    profiler = cProfile.Profile() if profile_path else None
+    if trace_memory:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            pstats.Stats(profiler, stream=stream or sys.stdout).sort_stats('cumulative').print_stats(top)
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"Память: текущая {current / 2 ** 20:.1f} МБ, пиковая {peak / 2 ** 20:.1f} МБ", file=stream)
+            for stat in snapshot.statistics('lineno')[:top]:
+                print(stat, file=stream)
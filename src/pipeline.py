@@ -0,0 +1,49 @@
+import queue
+import threading
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar('T')
+
+_END = object()
+
+
+def prefetch(iterable: Iterable[T], buffer_size: int = 1000) -> Iterator[T]:
+    """возвращает элементы iterable, получая их в отдельном потоке заранее, но не более buffer_size элементов.
+
+    Позволяет совместить получение данных (например, ожидание ответов сервера) с их обработкой
+    (например, записью в БД), не накапливая в памяти больше buffer_size элементов.
+    Исключение, возникшее при получении элементов, передается в вызывающий поток."""
+
+    buffer = queue.Queue(maxsize=buffer_size)
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except BaseException as e:
+            put((_END, e))
+        else:
+            put((_END, None))
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is _END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
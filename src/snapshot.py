@@ -0,0 +1,299 @@
+import json
+import os
+import re
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SNAPSHOT_VERSION = 1
+META_FILE = 'meta.json'
+# Типы колонок снимка:
+# 'str' - строки: байты UTF-8 всех значений подряд (<колонка>.data.npy), смещения значений (<колонка>.offsets.npy)
+#         и признаки значений, отличных от NULL (<колонка>.valid.npy; NULL хранится в data как пустая строка);
+# 'int' - целые числа с NULL, хранятся как float64 (NULL - NaN);
+# 'datetime' - время UTC, хранится как datetime64[us] (NULL - NaT);
+# 'bool' - логические значения
+COLUMN_TYPES = ('str', 'int', 'datetime', 'bool')
+
+# типы массивов NumPy нестроковых колонок
+_DTYPES = {'int': np.float64, 'datetime': 'datetime64[us]', 'bool': np.bool_} if np is not None else None
+# NULL колонки 'datetime' (NaT) - минимальное значение int64
+_NAT = str(np.iinfo(np.int64).min).encode() if np is not None else None
+_COPY_ESCAPES = {b'b': b'\b', b'f': b'\f', b'n': b'\n', b'r': b'\r', b't': b'\t', b'v': b'\v', b'\\': b'\\'}
+_COPY_ESCAPE_RE = re.compile(rb'\\(.)')
+
+
+def require_numpy():
+    if np is None:
+        raise ImportError("Для снимков данных и аналитики зарплат необходим пакет numpy: "
+                          "poetry install --extras analytics")
+
+
+def _unescape_copy_value(value: bytes) -> bytes:
+    """преобразует значение из текстового формата COPY"""
+
+    if b'\\' not in value:
+        return value
+    return _COPY_ESCAPE_RE.sub(lambda m: _COPY_ESCAPES.get(m.group(1), m.group(1)), value)
+
+
+class StringColumn:
+    """Колонка строк снимка: байты UTF-8 всех значений подряд (data), смещения начала значений (offsets,
+    на одно больше количества строк) и признаки значений, отличных от NULL (valid; None - NULL в колонке нет).
+    Значения декодируются при обращении, NULL возвращается как None"""
+
+    __slots__ = ('data', 'offsets', 'valid')
+
+    def __init__(self, data: 'np.ndarray', offsets: 'np.ndarray', valid: Optional['np.ndarray'] = None):
+        self.data = data
+        self.offsets = offsets
+        self.valid = valid
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> Optional[str]:
+        if self.valid is not None and not self.valid[index]:
+            return None
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.data[start:end].tobytes().decode('utf-8')
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        return self.slice(0, len(self))
+
+    def slice(self, start: int, stop: int) -> Iterator[Optional[str]]:
+        """возвращает значения с номерами от start до stop (не включая stop)"""
+
+        offsets = self.offsets[start:stop + 1].tolist()
+        data = self.data[offsets[0]:offsets[-1]].tobytes() if offsets else b''
+        base = offsets[0] if offsets else 0
+        values = (data[a - base:b - base].decode('utf-8') for a, b in zip(offsets, offsets[1:]))
+        if self.valid is None:
+            return values
+        return (value if valid else None for value, valid in zip(values, self.valid[start:stop].tolist()))
+
+    def tolist(self) -> List[Optional[str]]:
+        return list(self)
+
+
+class SnapshotTableWriter:
+    """Файлоподобный объект для COPY ... TO STDOUT (copy_expert): разбирает строки текстового формата COPY
+    и накапливает значения в колонках типов columns (см. COLUMN_TYPES) в памяти. Строки разбираются пакетами
+    по chunk_size байт, значения колонок пакета преобразуются в массивы NumPy целиком.
+    Время в колонках 'datetime' передается в COPY числом микросекунд от начала эпохи Unix"""
+
+    def __init__(self, columns: Dict[str, str], chunk_size: int = 2 ** 22):
+        require_numpy()
+        for column_type in columns.values():
+            if column_type not in COLUMN_TYPES:
+                raise ValueError(f"Неизвестный тип колонки снимка: '{column_type}'")
+        self.columns = dict(columns)
+        self.chunk_size = chunk_size
+        self.rows = 0
+        self.__buffer = bytearray()
+        self.__chunks = {name: [] for name in self.columns}
+        # для строковых колонок - суммарная длина уже разобранных значений
+        self.__string_sizes = {name: 0 for name, column_type in self.columns.items() if column_type == 'str'}
+
+    def write(self, data: Union[bytes, str]):
+        self.__buffer += data.encode('utf-8') if isinstance(data, str) else data
+        if len(self.__buffer) >= self.chunk_size:
+            end = self.__buffer.rfind(b'\n') + 1
+            self._parse(bytes(self.__buffer[:end]))
+            del self.__buffer[:end]
+
+    def _parse(self, data: bytes):
+        """разбирает пакет строк data (каждая строка заканчивается переводом строки)"""
+
+        lines = data.split(b'\n')
+        lines.pop()
+        if not lines:
+            return
+        for (name, column_type), values in zip(self.columns.items(), zip(*(line.split(b'\t') for line in lines))):
+            if column_type == 'str':
+                if b'\\N' in values:
+                    valid = np.fromiter((v != b'\\N' for v in values), dtype=np.bool_, count=len(values))
+                    values = [b'' if v == b'\\N' else v for v in values]
+                else:
+                    valid = np.ones(len(values), dtype=np.bool_)
+                joined = b''.join(values)
+                if b'\\' in joined:
+                    values = [_unescape_copy_value(v) for v in values]
+                    joined = b''.join(values)
+                lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+                offsets = np.cumsum(lengths) + self.__string_sizes[name]
+                self.__string_sizes[name] += len(joined)
+                self._add_chunk(name, (np.frombuffer(joined, dtype=np.uint8), offsets, valid))
+            elif column_type == 'bool':
+                self._add_chunk(name, np.array(values) == b't')
+            elif column_type == 'int':
+                array = np.array(values, dtype='S24')
+                array[array == b'\\N'] = b'nan'
+                self._add_chunk(name, array.astype(np.float64))
+            else:
+                array = np.array(values, dtype='S24')
+                array[array == b'\\N'] = _NAT
+                self._add_chunk(name, array.astype(np.int64).view('datetime64[us]'))
+        self.rows += len(lines)
+
+    def _add_chunk(self, name: str, chunk):
+        """сохраняет значения колонки name из очередного пакета строк, начинающегося со строки self.rows:
+        для строковых колонок - (байты значений, смещения концов значений, признаки не NULL), иначе массив"""
+
+        self.__chunks[name].append(chunk)
+
+    def _flush(self):
+        """разбирает оставшиеся в буфере строки"""
+
+        self._parse(bytes(self.__buffer))
+        self.__buffer.clear()
+
+    def arrays(self) -> Dict[str, Union['np.ndarray', StringColumn]]:
+        """возвращает разобранные колонки: StringColumn для строковых колонок, иначе массивы NumPy"""
+
+        self._flush()
+        arrays = {}
+        for name, column_type in self.columns.items():
+            chunks = self.__chunks[name]
+            if column_type == 'str':
+                arrays[name] = StringColumn(np.concatenate([np.empty(0, np.uint8), *(c[0] for c in chunks)]),
+                                            np.concatenate([np.zeros(1, np.int64), *(c[1] for c in chunks)]),
+                                            np.concatenate([np.empty(0, np.bool_), *(c[2] for c in chunks)]))
+            else:
+                arrays[name] = np.concatenate([np.empty(0, _DTYPES[column_type]), *chunks])
+        return arrays
+
+
+class SnapshotFileWriter(SnapshotTableWriter):
+    """Файлоподобный объект для COPY ... TO STDOUT, записывающий колонки таблицы table сразу в файлы снимка
+    в каталоге directory: файлы .npy нужного размера создаются заранее и отображаются в память (mmap), значения
+    каждого разобранного пакета строк записываются на свое место, поэтому таблица целиком в памяти не хранится.
+    rows - количество строк таблицы, string_sizes - суммарный размер значений строковых колонок в байтах UTF-8
+    (NULL - 0 байт); если данные COPY с ними не совпадут, save выбросит ValueError"""
+
+    def __init__(self, directory: str, table: str, columns: Dict[str, str], rows: int,
+                 string_sizes: Dict[str, int], chunk_size: int = 2 ** 22):
+        super().__init__(columns, chunk_size)
+        self.table = table
+        self.expected_rows = rows
+        self.__files = {}
+        for name, column_type in self.columns.items():
+            path = os.path.join(directory, f'{table}.{name}')
+            if column_type == 'str':
+                offsets = _open_memmap(f'{path}.offsets.npy', np.int64, rows + 1)
+                offsets[0] = 0
+                self.__files[name] = (_open_memmap(f'{path}.data.npy', np.uint8, string_sizes[name]), offsets,
+                                      _open_memmap(f'{path}.valid.npy', np.bool_, rows))
+            else:
+                self.__files[name] = _open_memmap(f'{path}.npy', _DTYPES[column_type], rows)
+
+    def _add_chunk(self, name: str, chunk):
+        start = self.rows
+        if self.columns[name] == 'str':
+            data, offsets, valid = chunk
+            data_file, offsets_file, valid_file = self.__files[name]
+            stop = start + len(offsets)
+            if stop > self.expected_rows or (len(offsets) and offsets[-1] > len(data_file)):
+                raise ValueError(f"Данные таблицы '{self.table}' не совпадают с ожидаемым размером")
+            if len(offsets):
+                data_file[offsets[-1] - len(data):offsets[-1]] = data
+            offsets_file[start + 1:stop + 1] = offsets
+            valid_file[start:stop] = valid
+        else:
+            column_file = self.__files[name]
+            stop = start + len(chunk)
+            if stop > self.expected_rows:
+                raise ValueError(f"Данные таблицы '{self.table}' не совпадают с ожидаемым размером")
+            column_file[start:stop] = chunk
+
+    def save(self) -> dict:
+        """дописывает оставшиеся строки и закрывает файлы; возвращает описание таблицы для META_FILE"""
+
+        self._flush()
+        for name, files in self.__files.items():
+            for column_file in files if isinstance(files, tuple) else (files,):
+                column_file.flush()
+            if self.columns[name] == 'str' and files[1][-1] != len(files[0]):
+                raise ValueError(f"Данные таблицы '{self.table}' не совпадают с ожидаемым размером")
+        self.__files.clear()
+        if self.rows != self.expected_rows:
+            raise ValueError(f"Данные таблицы '{self.table}' не совпадают с ожидаемым размером")
+        return {'rows': self.rows, 'columns': self.columns}
+
+
+def _open_memmap(path: str, dtype, size: int) -> 'np.memmap':
+    return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(size,))
+
+
+def write_meta(directory: str, tables: Dict[str, dict]):
+    """сохраняет описание снимка; файл описания записывается последним, поэтому его наличие означает,
+    что снимок сохранен полностью"""
+
+    meta = {'version': SNAPSHOT_VERSION, 'created_at': datetime.now(timezone.utc).isoformat(), 'tables': tables}
+    tmp_path = os.path.join(directory, f'{META_FILE}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, os.path.join(directory, META_FILE))
+
+
+class Snapshot:
+    """Колоночный снимок данных в каталоге directory: файл описания META_FILE и по файлу .npy на колонку
+    (три для строковых колонок). Если mmap=True, колонки не читаются в память, а отображаются на файлы"""
+
+    def __init__(self, directory: str, mmap: bool = True):
+        require_numpy()
+        self.directory = directory
+        self.mmap_mode = 'r' if mmap else None
+        try:
+            with open(os.path.join(directory, META_FILE), encoding='utf-8') as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Не найден снимок данных в каталоге '{directory}'") from None
+        if meta.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия снимка данных: {meta.get('version')}")
+        self.created_at = datetime.fromisoformat(meta['created_at'])
+        self.tables: Dict[str, dict] = meta['tables']
+
+    def rows(self, table: str) -> int:
+        return self.tables[table]['rows']
+
+    def columns(self, table: str) -> Dict[str, str]:
+        return self.tables[table]['columns']
+
+    def column(self, table: str, name: str) -> Union['np.ndarray', StringColumn]:
+        """возвращает колонку name таблицы table: StringColumn для строковых колонок, иначе массив NumPy"""
+
+        path = os.path.join(self.directory, f'{table}.{name}')
+        if self.columns(table)[name] == 'str':
+            return StringColumn(np.load(f'{path}.data.npy', mmap_mode=self.mmap_mode),
+                                np.load(f'{path}.offsets.npy', mmap_mode=self.mmap_mode),
+                                np.load(f'{path}.valid.npy', mmap_mode=self.mmap_mode))
+        return np.load(f'{path}.npy', mmap_mode=self.mmap_mode)
+
+    def iter_rows(self, table: str, columns: Optional[Sequence[str]] = None,
+                  batch_size: int = 10000) -> Iterator[tuple]:
+        """возвращает строки таблицы table из колонок columns (по умолчанию всех) в виде кортежей значений Python
+        (NULL - None, время - datetime с часовым поясом UTC); колонки читаются пакетами по batch_size строк"""
+
+        columns = list(columns or self.columns(table))
+        types = [self.columns(table)[name] for name in columns]
+        arrays = [self.column(table, name) for name in columns]
+        rows = self.rows(table)
+        for start in range(0, rows, batch_size):
+            stop = min(start + batch_size, rows)
+            values = []
+            for column_type, column in zip(types, arrays):
+                if column_type == 'str':
+                    values.append(column.slice(start, stop))
+                elif column_type == 'int':
+                    values.append(None if v != v else int(v) for v in column[start:stop].tolist())
+                elif column_type == 'datetime':
+                    values.append(None if v is None else v.replace(tzinfo=timezone.utc)
+                                  for v in column[start:stop].tolist())
+                else:
+                    values.append(column[start:stop].tolist())
+            yield from zip(*values)
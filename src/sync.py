@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+from src.crawler import Shard, ShardedCrawler
+from src.dbmanager import DBManager
+from src.hh_api import HeadHunterAPI, HHAPIError
+from src.metrics import metrics
+from src.pipeline import prefetch
+from src.vacancy import Vacancy
+
+# срок, после которого неподнятая вакансия снимается с публикации на hh.ru
+VACANCY_LIFETIME = timedelta(days=30)
+# запас на задержку индексации поиска hh.ru при инкрементальной синхронизации
+SYNC_OVERLAP = timedelta(minutes=10)
+
+
+def sync_vacancies(hh_api: HeadHunterAPI, db: DBManager, companies: List[dict], full: bool = False,
+                   on_progress: Optional[Callable[[Shard, int, int], None]] = None) -> dict:
+    """синхронизирует вакансии компаний из списка companies с базой данных.
+
+    Вакансии обрабатываются потоком: получение страниц с сервера идет параллельно с записью в БД
+    пакетами по db.batch_size вакансий, поэтому в памяти хранятся только id полученных вакансий, а не сами вакансии.
+    Для компании, которая уже синхронизировалась, запрашиваются только вакансии, опубликованные
+    (или поднятые, что на hh.ru обновляет дату публикации) после предыдущей синхронизации, после чего
+    проверяется, что разница между количеством вакансий компании в выдаче и количеством ее активных вакансий в БД
+    (вакансии с зарплатой не в рублях в БД не сохраняются) осталась такой же, как при предыдущей синхронизации;
+    если нет (часть вакансий снята с публикации), вакансии компании запрашиваются полностью.
+    Для остальных компаний, а также при full=True, сразу запрашиваются все вакансии.
+    Вакансии компании, запрошенной полностью, которых больше нет в выдаче, переносятся в архив.
+    Вакансии остальных компаний (в том числе компаний, вакансии которых получить не удалось), не обновлявшиеся
+    дольше VACANCY_LIFETIME и не полученные при этой синхронизации, также переносятся в архив.
+    Время синхронизации сохраняется только для компаний, все вакансии которых удалось получить.
+
+    Возвращает словарь с количеством полученных ('fetched') и перенесенных в архив ('archived') вакансий
+    и списком id компаний, вакансии которых получить не удалось ('failed')."""
+
+    started_at = datetime.now(timezone.utc)
+    sync_state = {} if full else db.get_sync_state()
+    since = {employer_id: synced_at - SYNC_OVERLAP for employer_id, synced_at in sync_state.items()}
+    skipped = {} if full else db.get_skipped_counts()
+
+    employer_ids = [list(c.keys())[0] for c in companies]
+    fetched_ids = {employer_id: set() for employer_id in employer_ids}
+
+    def track(vacancies: Iterator[Vacancy]) -> Iterator[Vacancy]:
+        for vacancy in vacancies:
+            ids = fetched_ids.setdefault(vacancy.employer_id, set())
+            if vacancy.vacancy_id not in ids:
+                ids.add(vacancy.vacancy_id)
+                yield vacancy
+
+    crawler = ShardedCrawler(hh_api, on_progress=on_progress)
+
+    def fetch_and_save(employers: List[dict], since: Optional[Dict[str, datetime]] = None) -> Set[str]:
+        """сохраняет вакансии компаний employers; возвращает id компаний, вакансии которых получить не удалось"""
+
+        db.save_vacancies(track(prefetch(crawler.crawl(employers, since), buffer_size=2 * db.batch_size)),
+                          refresh=False)
+        return {shard.employer_id for shard in crawler.failed_shards}
+
+    with metrics.timer('sync_stage_seconds', stage='fetch_and_save'):
+        db.save_companies(companies, refresh=False)
+        failed = fetch_and_save(companies, since)
+    # количество вакансий компаний в выдаче, включая вакансии с зарплатой не в рублях
+    found = dict(crawler.found)
+
+    crawled = {employer_id for employer_id in employer_ids if employer_id not in sync_state}
+    incremental = [employer_id for employer_id in employer_ids
+                   if employer_id in sync_state and employer_id not in failed]
+    if incremental:
+        with metrics.timer('sync_stage_seconds', stage='check'):
+            active = db.count_active_vacancies()
+            changed = set()
+            for employer_id in incremental:
+                try:
+                    found[employer_id] = crawler.count(employer_id)
+                except HHAPIError:
+                    failed.add(employer_id)
+                    continue
+                if found[employer_id] - active.get(employer_id, 0) != skipped.get(employer_id):
+                    changed.add(employer_id)
+        if changed:
+            with metrics.timer('sync_stage_seconds', stage='fetch_and_save'):
+                failed |= fetch_and_save([c for c in companies if list(c.keys())[0] in changed])
+                found.update(crawler.found)
+            crawled |= changed
+
+    synced = [employer_id for employer_id in employer_ids if employer_id not in failed]
+    archived = 0
+    with metrics.timer('sync_stage_seconds', stage='archive'):
+        for employer_id in synced:
+            if employer_id in crawled:
+                archived += db.archive_missing_vacancies(employer_id, fetched_ids[employer_id], refresh=False)
+        archived += db.archive_expired_vacancies(started_at - VACANCY_LIFETIME,
+                                                 chain.from_iterable(fetched_ids.values()), synced, refresh=False)
+    with metrics.timer('sync_stage_seconds', stage='refresh_stats'):
+        db.refresh_stats()
+    active = db.count_active_vacancies()
+    db.save_sync_state({employer_id: started_at for employer_id in synced},
+                       {employer_id: found[employer_id] - active.get(employer_id, 0)
+                        for employer_id in synced if employer_id in found})
+    fetched = sum(map(len, fetched_ids.values()))
+    metrics.inc('sync_vacancies_fetched_total', fetched)
+    metrics.inc('sync_vacancies_archived_total', archived)
+
+    return {'fetched': fetched, 'archived': archived, 'failed': sorted(failed)}
@@ -0,0 +1,86 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+class TokenBucket:
+    """Ограничитель частоты запросов: в среднем не больше rate запросов в секунду, подряд - не больше capacity.
+
+    Частота подстраивается под ответы сервера: при перегрузке (ответы 429 и 5xx) уменьшается вдвое,
+    но не ниже min_rate, после каждого успешного ответа увеличивается на increase, но не выше max_rate"""
+
+    def __init__(self, rate: float = 10, capacity: float = 4, min_rate: float = 0.5,
+                 max_rate: Optional[float] = None, increase: float = 0.1):
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_rate = rate if max_rate is None else max_rate
+        self.increase = increase
+        self.__tokens = capacity
+        self.__updated_at = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self):
+        """ожидает, пока можно будет отправить запрос"""
+
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated_at) * self.rate)
+                self.__updated_at = now
+                if self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return
+                wait = (1 - self.__tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        with self.__lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        with self.__lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+
+class RetryPolicy:
+    """Правила повтора неудачных запросов: не больше retries повторов, задержка перед повтором растет
+    экспоненциально от backoff до max_backoff секунд со случайным разбросом (jitter), чтобы параллельные
+    запросы не повторялись одновременно. Задержка, указанная сервером в заголовке Retry-After, соблюдается
+    (но не больше max_backoff)"""
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, retries: int = 5, backoff: float = 0.5, max_backoff: float = 30, jitter: bool = True):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """возвращает задержку в секундах из заголовка Retry-After (число секунд или дата)"""
+
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """возвращает задержку перед повтором номер attempt (начиная с 0)"""
+
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        if self.jitter:
+            delay = random.uniform(delay / 2, delay)
+        server_delay = self.parse_retry_after(retry_after)
+        if server_delay is not None:
+            delay = max(delay, min(server_delay, self.max_backoff))
+        return delay
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from json import load
 from typing import List
 
@@ -14,7 +15,11 @@ def print_menu():
                  "2 - поиск вакансий по ключевому слову\n"
                  "3 - просмотр списка компаний\n"
                  "4 - просмотр списка вакансий\n"
-                 "5 - завершить работу с программой\n")
+                 "5 - завершить работу с программой\n"
+                 "6 - просмотр вакансий с зарплатой выше средней\n"
+                 "7 - просмотр перцентилей и гистограммы зарплат\n"
+                 "8 - просмотр распределения зарплат по компаниям\n"
+                 "9 - сравнение зарплат по ключевым словам\n")
 
 
 def print_vacancies_by_keyword(db: DBManager):
@@ -33,29 +38,112 @@ def print_vacancies_by_keyword(db: DBManager):
         print(f"Не найдено вакансий по ключевому слову '{keyword}'.")
 
 
-def print_all_vacancies(db: DBManager):
-    """выводит на экран список всех вакансий"""
+def print_all_vacancies(db: DBManager, page_size: int = 50):
+    """выводит на экран список всех вакансий постранично, получая из БД только выводимую страницу"""
 
-    all_vacancies = db.get_all_vacancies()
-    if all_vacancies:
+    page = db.get_vacancies_page(page_size)
+    if not page:
+        print(f"В базе данных нет вакансий.")
+        return
+    print(f"Список всех вакансий:")
+    while page:
         t = PrettyTable(['Вакансия', 'Зарплата', 'Компания', 'Ссылка на вакансию'])
         t.align = 'r'
-        print(f"Список всех вакансий:")
-        for v in all_vacancies:
+        for v in page:
             t.add_row([v.name, v.salary if v.salary > 0 else 'не указана', v.employer_name, v.url])
         print(t)
-    else:
-        print(f"В базе данных нет вакансий.")
+        if len(page) < page_size:
+            break
+        if input("Enter - следующая страница, q - вернуться в меню: ").strip().lower() == 'q':
+            break
+        page = db.get_vacancies_page(page_size, after=(page[-1].salary, page[-1].vacancy_id))
 
 
 def print_companies(db: DBManager):
-    """выводит на экран список компаний и кол-во опбуликованных вакансий"""
+    """выводит на экран список компаний, кол-во опубликованных вакансий и статистику зарплат по ним"""
+
+    t = PrettyTable(['Компания', 'Кол-во вакансий', 'Средняя зарплата', 'Мин. зарплата', 'Макс. зарплата'])
+    t.align = 'r'
+    for data in db.get_employer_stats():
+        salaries = [data[key] if data[key] is not None else '-' for key in ('avg_salary', 'min_salary', 'max_salary')]
+        t.add_row([data['company_name'], data['count'], *salaries])
+    print(t)
+
+
+def print_vacancies_with_higher_salary(db: DBManager):
+    """выводит на экран список вакансий с зарплатой выше средней"""
+
+    vacancies = db.get_vacancies_with_higher_salary()
+    if not vacancies:
+        print("Не найдено вакансий с зарплатой выше средней.")
+        return
+    t = PrettyTable(['Вакансия', 'Зарплата', 'Компания', 'Ссылка на вакансию'])
+    t.align = 'r'
+    for v in vacancies:
+        t.add_row([v.name, v.salary, v.employer_name, v.url])
+    print(f"Вакансии с зарплатой выше средней ({db.get_avg_salary()} рублей):")
+    print(t)
+
+
+@lru_cache(maxsize=1)
+def _salary_analytics(db: DBManager):
+    """возвращает объект аналитики зарплат БД db (один на БД, чтобы результаты кэшировались между пунктами меню).
+    Модуль аналитики (и NumPy) импортируется только при первом обращении; без NumPy выбрасывается ImportError"""
+
+    from src.analytics import SalaryAnalytics
+
+    return SalaryAnalytics(db)
+
+
+def print_salary_distribution(db: DBManager, bins: int = 10):
+    """выводит на экран перцентили зарплат и гистограмму зарплат"""
+
+    analytics = _salary_analytics(db)
+    percentiles = analytics.percentiles()
+    if not percentiles:
+        print("В базе данных нет вакансий с указанной зарплатой.")
+        return
+    t = PrettyTable([f'{q}-й перцентиль' for q in percentiles])
+    t.add_row(list(percentiles.values()))
+    print(t)
+
+    histogram = analytics.histogram(bins)
+    max_count = max(h['count'] for h in histogram)
+    t = PrettyTable(['Зарплата', 'Кол-во вакансий', ''])
+    t.align = 'l'
+    for h in histogram:
+        t.add_row([f"{h['from']} - {h['to']}", h['count'], '#' * round(40 * h['count'] / max_count)])
+    print(t)
+
+
+def print_employer_salary_distribution(db: DBManager):
+    """выводит на экран распределение зарплат по компаниям"""
+
+    analytics = _salary_analytics(db)
+    distribution = analytics.employer_distribution()
+    if not distribution:
+        print("В базе данных нет вакансий с указанной зарплатой.")
+        return
+    t = PrettyTable(['Компания', 'Кол-во вакансий с зарплатой', 'Мин.', '25-й перцентиль', 'Медиана',
+                     '75-й перцентиль', 'Макс.'])
+    t.align = 'r'
+    for d in distribution:
+        t.add_row([d['company_name'], d['count'], d['min_salary'], d['percentiles'][25], d['median_salary'],
+                   d['percentiles'][75], d['max_salary']])
+    print(t)
+
+
+def print_keyword_salary_stats(db: DBManager):
+    """выводит на экран статистику зарплат по вакансиям, найденным по ключевым словам (через запятую)"""
 
-    companies_and_vacancies_count = db.get_companies_and_vacancies_count()
-    t = PrettyTable(['Компания', 'Кол-во вакансий'])
+    analytics = _salary_analytics(db)
+    keywords = input("Введите ключевые слова через запятую: ").strip() or "python, java, аналитик"
+    t = PrettyTable(['Ключевые слова', 'Кол-во вакансий с зарплатой', 'Доля вакансий', 'Средняя зарплата',
+                     '25-й перцентиль', 'Медиана', '75-й перцентиль'])
     t.align = 'r'
-    for data in companies_and_vacancies_count:
-        t.add_row(data.values())
+    for stats in analytics.keyword_stats([k.strip() for k in keywords.split(',') if k.strip()]):
+        salaries = [stats[key] if stats[key] is not None else '-' for key in ('avg_salary', 25, 50, 75)]
+        t.add_row([stats['keyword'], stats['count'], f"{stats['share']:.1%}", *salaries])
     print(t)
 
 
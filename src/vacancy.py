@@ -1,23 +1,35 @@
-from typing import List
+import time
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Union
+
+from src.metrics import metrics
 
 
 class Vacancy:
     """Класс для работы с вакансиями."""
 
+    __slots__ = ('__v_id', '__name', '__salary', '__employer_id', '__employer_name', '__url', '__published_at',
+                 '__salary_to')
+
     __v_id: str
     __name: str
     __salary: int
     __employer_id: str
     __employer_name: str
     __url: str
+    __published_at: Optional[Union[datetime, str]]
+    __salary_to: Optional[int]
 
-    def __init__(self, v_id: str, name: str, employer_id: str, employer_name: str, url: str, salary: int = None, ):
+    def __init__(self, v_id: str, name: str, employer_id: str, employer_name: str, url: str, salary: int = None,
+                 published_at: Optional[Union[datetime, str]] = None, salary_to: Optional[int] = None):
         self.__v_id = v_id
         self.__name = name
         self.__salary = 0 if salary is None else salary
         self.__employer_id = employer_id
         self.__employer_name = employer_name
         self.__url = url
+        self.__published_at = published_at
+        self.__salary_to = salary_to
 
     def __str__(self):
         salary_str = 'зарплата не указана' if self.__salary == 0 else f'зарплата от {self.__salary} руб.'
@@ -29,6 +41,10 @@ class Vacancy:
     def salary(self):
         return self.__salary
 
+    @property
+    def salary_to(self):
+        return self.__salary_to
+
     @property
     def name(self):
         return self.__name
@@ -49,23 +65,50 @@ class Vacancy:
     def url(self):
         return self.__url
 
+    @property
+    def published_at(self):
+        return self.__published_at
+
     @classmethod
-    def cast_to_object_list(cls, v_json_list: List[dict]) -> List['Vacancy']:
-        """преобразует список словарей, содержащих данные о вакансии, полученных с сервера в список объектов вакансий"""
+    def from_json(cls, v: dict) -> 'Vacancy':
+        """создает объект вакансии из словаря с данными вакансии, полученного с сервера"""
 
-        vacancies: List['Vacancy'] = []
-        for v in v_json_list:
-            v_id = v.get('id', '')
-            name = v.get('name', '')
+        v_id = v.get('id', '')
+        name = v.get('name', '')
 
-            salary_obj = v.get('salary')
-            salary = salary_obj['from'] if salary_obj is not None else 0
+        salary_obj = v.get('salary')
+        salary = salary_obj['from'] if salary_obj is not None else 0
+        salary_to = salary_obj.get('to') if salary_obj is not None else None
 
-            url = v.get('url')
+        url = v.get('url')
 
-            employer_obj = v.get('employer')
-            employer_name = employer_obj['name']
-            employer_id = employer_obj['id']
+        employer_obj = v.get('employer')
+        employer_name = employer_obj['name']
+        employer_id = employer_obj['id']
+
+        published_at = v.get('published_at')
+
+        return cls(v_id, name, employer_id, employer_name, url, salary, published_at, salary_to)
+
+    @classmethod
+    def iter_objects(cls, v_json_iterable: Iterable[dict]) -> Iterator['Vacancy']:
+        """лениво преобразует словари, содержащие данные о вакансии, полученные с сервера, в объекты вакансий.
+        Количество и суммарное время преобразования учитываются в метриках по завершении обхода"""
+
+        count, elapsed = 0, 0.0
+        try:
+            for v in v_json_iterable:
+                start = time.perf_counter()
+                vacancy = cls.from_json(v)
+                elapsed += time.perf_counter() - start
+                count += 1
+                yield vacancy
+        finally:
+            metrics.inc('vacancies_parsed_total', count)
+            metrics.inc('vacancy_parse_seconds_total', elapsed)
+
+    @classmethod
+    def cast_to_object_list(cls, v_json_list: List[dict]) -> List['Vacancy']:
+        """преобразует список словарей, содержащих данные о вакансии, полученных с сервера в список объектов вакансий"""
 
-            vacancies.append(cls(v_id, name, employer_id, employer_name, url, salary))
-        return vacancies
+        return list(cls.iter_objects(v_json_list))
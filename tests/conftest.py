@@ -0,0 +1,8 @@
+import pytest
+
+from src.config import load_db_config
+
+
+@pytest.fixture
+def db_config():
+    return load_db_config()
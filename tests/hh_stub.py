@@ -0,0 +1,163 @@
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+from urllib.parse import parse_qs, urlparse
+
+from src.hh_api import HeadHunterAPI
+from src.throttle import RetryPolicy, TokenBucket
+
+
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S%z'
+
+
+@lru_cache(maxsize=None)
+def parse_date(value: str) -> datetime:
+    return datetime.strptime(value, DATE_FORMAT)
+
+
+def make_hh_vacancy(v_id: int, employer_id: str = '1', salary_from: int = None, currency: str = 'RUR',
+                    published_at: datetime = None) -> dict:
+    """создает словарь с данными вакансии в формате API HeadHunter"""
+
+    salary = None if salary_from is None else {'from': salary_from, 'to': None, 'currency': currency, 'gross': False}
+    return {
+        'id': str(v_id),
+        'name': f'Python developer {v_id}',
+        'salary': salary,
+        'url': f'https://api.hh.ru/vacancies/{v_id}?host=hh.ru',
+        'employer': {'id': employer_id, 'name': f'Company {employer_id}'},
+        'published_at': (published_at or datetime.now().astimezone()).strftime(DATE_FORMAT),
+    }
+
+
+class StubHHServer:
+    """Локальный HTTP-сервер, имитирующий поиск вакансий API HeadHunter (GET /vacancies).
+
+    Поддерживает параметры employer_id, date_from, date_to, page и per_page, ограничение выдачи 2000 вакансиями
+    и задержку latency (в секундах) перед каждым ответом. Полученные параметры запросов сохраняются в requests.
+    Ответы содержат ETag; на условный запрос с совпадающим If-None-Match сервер отвечает 304
+    (количество таких ответов - not_modified).
+    Для имитации сбоев первые failures запросов с одинаковыми параметрами получают ответ failure_status
+    (с заголовком Retry-After, если задан retry_after), а при truncate=True - ответ 200, соединение которого
+    обрывается, не передав тело полностью; количество таких ответов - failed."""
+
+    max_results = 2000
+
+    def __init__(self, vacancies: List[dict], latency: float = 0, failures: int = 0, failure_status: int = 503,
+                 retry_after: str = None, truncate: bool = False):
+        self.vacancies = vacancies
+        self.latency = latency
+        self.failures = failures
+        self.failure_status = failure_status
+        self.retry_after = retry_after
+        self.truncate = truncate
+        self.requests = []
+        self.not_modified = 0
+        self.failed = 0
+        self.__attempts = {}
+        self._lock = threading.Lock()
+        self.__server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.__server.server_address
+        return f'http://{host}:{port}/vacancies'
+
+    def __enter__(self):
+        self.__thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def api(self, **kwargs) -> HeadHunterAPI:
+        """создает клиент API этого сервера; по умолчанию без ограничения частоты запросов
+        и с короткими задержками перед повторами"""
+
+        kwargs.setdefault('rate_limiter', TokenBucket(rate=10000, capacity=100))
+        kwargs.setdefault('retry_policy', RetryPolicy(backoff=0.01, max_backoff=0.1))
+        return HeadHunterAPI(base_url=self.url, **kwargs)
+
+    def count_attempt(self, query: str) -> int:
+        """возвращает количество предыдущих запросов с теми же параметрами"""
+
+        attempt = self.__attempts.get(query, 0)
+        self.__attempts[query] = attempt + 1
+        return attempt
+
+    def search(self, query: dict) -> dict:
+        """возвращает страницу результатов поиска в формате API HeadHunter"""
+
+        employers = query.get('employer_id')
+        date_from = parse_date(query['date_from'][0]) if 'date_from' in query else None
+        date_to = parse_date(query['date_to'][0]) if 'date_to' in query else None
+        found = [v for v in self.vacancies
+                 if (not employers or v['employer']['id'] in employers)
+                 and (date_from is None or parse_date(v['published_at']) >= date_from)
+                 and (date_to is None or parse_date(v['published_at']) <= date_to)]
+        per_page = int(query.get('per_page', ['20'])[0])
+        page = int(query.get('page', ['0'])[0])
+        available = found[:self.max_results]
+        return {
+            'items': available[page * per_page:(page + 1) * per_page],
+            'found': len(found),
+            'pages': -(-len(available) // per_page),
+            'page': page,
+            'per_page': per_page,
+        }
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                with stub._lock:
+                    stub.requests.append(query)
+                    attempt = stub.count_attempt(urlparse(self.path).query)
+                time.sleep(stub.latency)
+                if attempt < stub.failures:
+                    with stub._lock:
+                        stub.failed += 1
+                    if stub.truncate:
+                        self.send_response(200)
+                        self.send_header('Content-Length', '1000')
+                        self.end_headers()
+                        self.wfile.write(b'{"items": [')
+                        self.close_connection = True
+                        return
+                    self.send_response(stub.failure_status)
+                    if stub.retry_after is not None:
+                        self.send_header('Retry-After', stub.retry_after)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = json.dumps(stub.search(query)).encode('utf-8')
+                etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                if self.headers.get('If-None-Match') == etag:
+                    with stub._lock:
+                        stub.not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,65 @@
+import pytest
+
+from src.dbmanager import DBManager
+from src.vacancy import Vacancy
+
+np = pytest.importorskip('numpy')
+
+from src.analytics import SalaryAnalytics  # noqa: E402
+
+
+@pytest.fixture
+def companies():
+    return [{"1": "Company 1"}, {"2": "Company 2"}, {"3": "Company 3"}]
+
+
+@pytest.fixture
+def vacancies():
+    names = ['Python developer', 'Java developer', 'Аналитик данных', 'Python аналитик']
+    return [Vacancy(str(i), names[i % 4], str(i % 3 + 1), f'Company {i % 3 + 1}',
+                    f'https://api.hh.ru/vacancies/{i}?host=hh.ru', None if i % 5 == 0 else 1000 * (i * 37 % 200))
+            for i in range(1, 301)]
+
+
+def test_salary_analytics(db_config, companies, vacancies):
+    with DBManager(db_config) as db:
+        db.clear()
+        db.save_companies(companies)
+        db.save_vacancies(vacancies)
+        analytics = SalaryAnalytics(db)
+
+        salaries = np.array([v.salary for v in vacancies if v.salary])
+        assert analytics.percentiles((10, 50, 90)) == dict(zip((10, 50, 90),
+                                                               np.percentile(salaries, (10, 50, 90)).round()))
+
+        distribution = analytics.employer_distribution()
+        assert [d['median_salary'] for d in distribution] == sorted((d['median_salary'] for d in distribution),
+                                                                    reverse=True)
+        for d in distribution:
+            employer_salaries = np.array([v.salary for v in vacancies
+                                          if v.salary and v.employer_id == d['employer_id']])
+            assert d['company_name'] == f"Company {d['employer_id']}"
+            assert d['count'] == len(employer_salaries)
+            assert d['avg_salary'] == round(employer_salaries.mean())
+            assert (d['min_salary'], d['max_salary']) == (employer_salaries.min(), employer_salaries.max())
+            assert d['median_salary'] == round(np.median(employer_salaries))
+            assert d['percentiles'] == {25: round(np.percentile(employer_salaries, 25)),
+                                        75: round(np.percentile(employer_salaries, 75))}
+
+        histogram = analytics.histogram(bins=4)
+        assert len(histogram) == 4
+        assert sum(h['count'] for h in histogram) == len(salaries)
+        assert (histogram[0]['from'], histogram[-1]['to']) == (salaries.min(), salaries.max())
+
+        python, missing = analytics.keyword_stats(['python', 'golang'])
+        python_salaries = np.array([v.salary for v in vacancies if v.salary and 'Python' in v.name])
+        assert python['count'] == len(python_salaries)
+        assert python['share'] == len(python_salaries) / len(salaries)
+        assert python[50] == round(np.median(python_salaries))
+        assert missing['count'] == 0 and missing['avg_salary'] is None
+
+        db.save_vacancies([Vacancy('1000', 'Python developer', '1', 'Company 1',
+                                   'https://api.hh.ru/vacancies/1000?host=hh.ru', 10 ** 6)])
+        assert analytics.percentiles((100,)) == {100: 10 ** 6}
+        assert analytics.keyword_stats(['python'])[0]['count'] == len(python_salaries) + 1
+        db.clear()
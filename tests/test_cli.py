@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+import subprocess
+import sys
+
+from src.cli import main
+from src.config import PROJECT_DIR
+from src.dbmanager import DBManager
+from tests.hh_stub import StubHHServer, make_hh_vacancy
+
+
+def run_cli(argv, capsys) -> tuple:
+    exit_code = main(argv)
+    return exit_code, capsys.readouterr().out
+
+
+def test_cli(db_config, tmp_path, capsys):
+    hh_vacancies = [make_hh_vacancy(i, employer_id=str(i % 3 + 1), salary_from=None if i % 4 == 0 else 1000 * i)
+                    for i in range(1, 91)]
+    (tmp_path / 'first.json').write_text(json.dumps([{"1": "Company 1"}, {"2": "Company 2"}]), encoding='utf-8')
+    (tmp_path / 'second.json').write_text(json.dumps([{"3": "Company 3"}]), encoding='utf-8')
+
+    with DBManager(db_config) as db:
+        db.clear()
+    with StubHHServer(hh_vacancies) as server:
+        exit_code, out = run_cli(['sync', '--no-cache', '--base-url', server.url, '--workers', '2',
+                                  str(tmp_path / 'first.json'), str(tmp_path / 'second.json'),
+                                  str(tmp_path / 'missing.json')], capsys)
+    results = json.loads(out)
+    assert exit_code == 1
+    assert [(r['companies'], r['fetched'], r['failed']) for r in results[:2]] == [(2, 60, []), (1, 30, [])]
+    assert results[2]['error'] is not None
+
+    exit_code, out = run_cli(['query', 'vacancies', '--format', 'csv', '--limit', '5'], capsys)
+    rows = list(csv.DictReader(io.StringIO(out)))
+    assert exit_code == 0
+    assert [int(r['salary']) for r in rows] == [90000, 89000, 87000, 86000, 85000]
+
+    exit_code, out = run_cli(['query', 'companies'], capsys)
+    assert sorted(c['count'] for c in json.loads(out)) == [30, 30, 30]
+
+    exit_code, out = run_cli(['query', 'keyword-stats', '-k', 'python', '-k', 'java'], capsys)
+    assert [(s['keyword'], s['count']) for s in json.loads(out)] == [('python', 68), ('java', 0)]
+
+    assert run_cli(['query', 'keyword'], capsys)[0] == 2
+
+    exit_code, out = run_cli(['--metrics', str(tmp_path / 'metrics.prom'), '--profile', str(tmp_path / 'query.prof'),
+                              'query', 'avg-salary'], capsys)
+    assert exit_code == 0 and json.loads(out)
+    assert 'db_query_seconds' in (tmp_path / 'metrics.prom').read_text(encoding='utf-8')
+    assert (tmp_path / 'query.prof').exists()
+
+    exit_code, out = run_cli(['export', str(tmp_path / 'snapshot'), '--format', 'csv'], capsys)
+    assert out.splitlines() == ['table,rows', 'employers,3', 'vacancies,90']
+
+    with DBManager(db_config) as db:
+        db.clear()
+
+
+def test_cli_query_lazy_imports(db_config):
+    code = ("import sys; from src.cli import main; main(['query', 'avg-salary']); "
+            "print(','.join(m for m in ('requests', 'numpy', 'src.hh_api') if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_DIR, capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == ''
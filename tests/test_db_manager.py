@@ -1,9 +1,11 @@
-import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
+import psycopg2
 import pytest
-from dotenv import load_dotenv
+from psycopg2 import sql
 
-from src.dbmanager import DBManager
+from src.dbmanager import DBManager, DBManagerError
 from src.vacancy import Vacancy
 
 
@@ -31,17 +33,7 @@ def vacancies():
     ]
 
 
-def test_db_manager(companies, vacancies):
-    load_dotenv()
-
-    db_config = {
-        'dbname': os.getenv('POSTGRES_DB'),
-        'user': os.getenv('POSTGRES_USER'),
-        'password': os.getenv('POSTGRES_PASSWORD'),
-        'host': os.getenv('POSTGRES_HOST', 'localhost'),
-        'port': os.getenv('POSTGRES_PORT', '5432')
-    }
-
+def test_db_manager(db_config, companies, vacancies):
     with DBManager(db_config) as db:
         db.clear()
         assert len(db.get_all_vacancies()) == 0
@@ -52,3 +44,134 @@ def test_db_manager(companies, vacancies):
         keyword = 'Developer'
         vacancies_by_keyword = list(filter(lambda v: keyword.lower() in v.name.lower(), vacancies))
         assert len(db.get_vacancies_with_keyword('Developer')) == len(vacancies_by_keyword)
+
+
+def test_db_manager_iterators(db_config, companies, vacancies):
+    with DBManager(db_config, itersize=2) as db:
+        db.clear()
+        db.save_companies(companies)
+        db.save_vacancies(vacancies)
+        all_vacancies = [v.vacancy_id for v in db.get_all_vacancies()]
+        assert [v.vacancy_id for v in db.iter_all_vacancies()] == all_vacancies
+
+        paged = []
+        page = db.get_vacancies_page(3)
+        while page:
+            paged.extend(v.vacancy_id for v in page)
+            page = db.get_vacancies_page(3, after=(page[-1].salary, page[-1].vacancy_id))
+        assert paged == all_vacancies
+
+        assert [v.vacancy_id for v in db.iter_vacancies_with_keyword('developer')] == \
+               [v.vacancy_id for v in db.get_vacancies_with_keyword('developer')]
+        assert [v.vacancy_id for v in db.iter_vacancies_with_higher_salary()] == \
+               [v.vacancy_id for v in db.get_vacancies_with_higher_salary()]
+        db.clear()
+
+
+def test_db_manager_salary(db_config, companies, vacancies):
+    vacancies.append(Vacancy('97418038', 'Менеджер по продажам',
+                             "5801953", "ООО Точка Маркетплейсы",
+                             "https://api.hh.ru/vacancies/97418038?host=hh.ru", 50000, salary_to=70000))
+
+    with DBManager(db_config) as db:
+        db.clear()
+        db.save_companies(companies)
+        db.save_vacancies(vacancies)
+        assert db.get_avg_salary() == 75000
+        assert [v.vacancy_id for v in db.get_vacancies_with_higher_salary()] == ['97418037']
+        assert [v.salary for v in db.get_all_vacancies()] == [100000, 50000, 0, 0, 0]
+        assert db.get_employer_stats() == [
+            {'employer_id': '5801953', 'company_name': 'ООО Точка Маркетплейсы', 'count': 5,
+             'avg_salary': 75000, 'min_salary': 50000, 'max_salary': 100000},
+            {'employer_id': '10259650', 'company_name': 'Softintermob LLC', 'count': 0,
+             'avg_salary': None, 'min_salary': None, 'max_salary': None}]
+        db.clear()
+
+
+def test_db_manager_keyword_search(db_config, companies, vacancies):
+    with DBManager(db_config) as db:
+        db.clear()
+        db.save_companies(companies)
+        db.save_vacancies(vacancies)
+
+        assert [v.vacancy_id for v in db.get_vacancies_with_keyword('developers')] == ['98530610', '97802709']
+        assert [v.vacancy_id for v in db.get_vacancies_with_keyword('python backend dev')] == ['98530610']
+        assert [v.vacancy_id for v in db.get_vacancies_with_keyword('продажа')] == ['97418037']
+        assert db.get_vacancies_with_keyword('python java') == []
+        assert db.get_vacancies_with_keyword('  ') == []
+
+        with db.cursor() as cur:
+            # на нескольких строках планировщик выбирает любой план, поэтому оставляем ему только GIN-индекс
+            cur.execute("SET LOCAL enable_seqscan = off; SET LOCAL enable_indexscan = off;")
+            tsquery = db._keyword_tsquery('python')
+            cur.execute(sql.SQL("EXPLAIN {query}").format(query=db._keyword_query()), (tsquery, tsquery))
+            plan = '\n'.join(row[0] for row in cur.fetchall())
+        assert 'vacancies_name_tsv_idx' in plan
+        db.clear()
+
+
+def test_db_manager_snapshot(db_config, companies, vacancies, tmp_path):
+    np = pytest.importorskip('numpy')
+    from src.snapshot import Snapshot
+
+    vacancies.append(Vacancy('97000001', 'Аналитик\tданных \\ BI', "10259650", "Softintermob LLC",
+                             "https://api.hh.ru/vacancies/97000001?host=hh.ru", 150000,
+                             datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc), 200000))
+    # вакансия без компании: NULL в строковой колонке снимка
+    vacancies.append(Vacancy('97000002', 'Тестировщик', None, None, "https://api.hh.ru/vacancies/97000002?host=hh.ru"))
+    with DBManager(db_config) as db:
+        db.clear()
+        db.save_companies(companies)
+        db.save_vacancies(vacancies)
+        db.archive_missing_vacancies('5801953', ['97835750', '97802709', '98530610'])
+        expected = sorted((v.vacancy_id, v.name, v.employer_name, v.url, v.salary) for v in db.get_all_vacancies())
+
+        assert db.export_snapshot(str(tmp_path)) == {'employers': 2, 'vacancies': 6}
+        snapshot = Snapshot(str(tmp_path))
+        ids = snapshot.column('vacancies', 'vacancy_id').tolist()
+        salary = snapshot.column('vacancies', 'salary_from')
+        assert isinstance(salary, np.memmap)
+        assert sorted(ids) == sorted(v.vacancy_id for v in vacancies)
+        assert np.nansum(salary) == 250000
+        assert snapshot.column('vacancies', 'archived').sum() == 1
+        row = next(r for r in snapshot.iter_rows('vacancies') if r[0] == '97000001')
+        assert row == ('97000001', 'Аналитик\tданных \\ BI', '10259650',
+                       'https://api.hh.ru/vacancies/97000001?host=hh.ru', 150000, 200000,
+                       datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc), False)
+        assert next(r for r in snapshot.iter_rows('vacancies', ['vacancy_id', 'employer_id'])
+                    if r[0] == '97000002') == ('97000002', None)
+
+        db.clear()
+        assert db.import_snapshot(str(tmp_path)) == {'employers': 2, 'vacancies': 6}
+        assert sorted((v.vacancy_id, v.name, v.employer_name, v.url, v.salary)
+                      for v in db.get_all_vacancies()) == expected
+        assert db.get_avg_salary() == 150000
+        with db.cursor() as cur:
+            cur.execute("SELECT vacancy_id FROM vacancies WHERE employer_id IS NULL")
+            assert cur.fetchall() == [('97000002',)]
+        db.clear()
+
+
+def test_db_manager_pool(db_config, companies, vacancies):
+    admin_config = db_config
+    db_config = dict(db_config, application_name='vacancies-db-pool-test')
+    with DBManager(db_config, maxconn=2, health_check_interval=0) as db:
+        db.clear()
+        db.save_companies(companies)
+        db.save_vacancies(vacancies)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            counts = list(executor.map(lambda _: len(db.get_all_vacancies()), range(32)))
+        assert counts == [len(vacancies)] * 32
+
+        with psycopg2.connect(**admin_config) as conn, conn.cursor() as cur:
+            cur.execute("SELECT COUNT(pg_terminate_backend(pid)) FROM pg_stat_activity WHERE application_name = %s;",
+                        (db_config['application_name'],))
+            assert cur.fetchone()[0] > 0
+        conn.close()
+        assert len(db.get_all_vacancies()) == len(vacancies)
+        db.clear()
+
+
+def test_db_manager_connection_error(db_config):
+    with pytest.raises(DBManagerError):
+        DBManager(dict(db_config, port='1'), connect_retries=1, retry_delay=0)
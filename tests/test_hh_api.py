@@ -0,0 +1,205 @@
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.crawler import ShardedCrawler
+from src import hh_json
+from src.hh_api import HHAPIError
+from src.http_cache import CachedResponse, DiskResponseCache, ResponseCache
+from src.throttle import RetryPolicy, TokenBucket
+from src.vacancy import Vacancy
+from tests.hh_stub import StubHHServer, make_hh_vacancy
+
+
+@pytest.fixture
+def hh_vacancies():
+    return [make_hh_vacancy(i, employer_id=str(i % 2), salary_from=1000 * i,
+                            currency='USD' if i % 7 == 0 else 'RUR')
+            for i in range(1, 1001)]
+
+
+@pytest.fixture
+def companies():
+    return [{"0": "Company 0"}, {"1": "Company 1"}]
+
+
+def test_get_vacancies_concurrent(hh_vacancies, companies):
+    with StubHHServer(hh_vacancies) as server:
+        hh_api = server.api(max_workers=4)
+        sequential = hh_api.get_vacancies(companies, concurrent=False)
+        concurrent = hh_api.get_vacancies(companies)
+        pages = list(hh_api.iter_pages(companies))
+
+    expected = [v for v in hh_vacancies if v['salary']['currency'] == 'RUR']
+    assert sequential == expected
+    assert concurrent == expected
+    assert len(pages) == 10
+    assert [v for page in pages for v in page] == expected
+
+
+def test_get_vacancies_concurrent_latency(hh_vacancies, companies):
+    with StubHHServer(hh_vacancies, latency=0.1) as server:
+        hh_api = server.api(max_workers=5)
+
+        start = time.perf_counter()
+        sequential = hh_api.get_vacancies(companies, concurrent=False)
+        sequential_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        concurrent = hh_api.get_vacancies(companies)
+        concurrent_time = time.perf_counter() - start
+
+    assert concurrent == sequential
+    assert sequential_time >= 1.0
+    assert concurrent_time < sequential_time / 2
+
+
+def test_sharded_crawler():
+    now = datetime.now(timezone.utc)
+    hh_vacancies = [make_hh_vacancy(i, employer_id='1', salary_from=1000 * i,
+                                    currency='USD' if i % 7 == 0 else 'RUR',
+                                    published_at=now - timedelta(minutes=10 * i))
+                    for i in range(1, 4501)]
+    hh_vacancies += [make_hh_vacancy(i, employer_id='2') for i in range(5001, 5051)]
+    companies = [{"1": "Company 1"}, {"2": "Company 2"}]
+    progress = []
+
+    with StubHHServer(hh_vacancies) as server:
+        hh_api = server.api()
+        truncated = hh_api.get_vacancies(companies)
+        crawler = ShardedCrawler(hh_api, on_progress=lambda shard, fetched, found: progress.append(fetched))
+        crawled = list(crawler.crawl(companies))
+
+    expected = [v for v in hh_vacancies if v['salary'] is None or v['salary']['currency'] == 'RUR']
+    assert len(truncated) < len(expected)
+    assert sorted(v.vacancy_id for v in crawled) == sorted(v['id'] for v in expected)
+    assert not crawler.failed_shards
+    assert len(progress) > 2
+    assert all(fetched <= ShardedCrawler.max_results for fetched in progress)
+
+
+def test_get_vacancies_cache(hh_vacancies, companies, tmp_path):
+    with StubHHServer(hh_vacancies) as server:
+        hh_api = server.api(cache=DiskResponseCache(str(tmp_path), ttl=60))
+        first = hh_api.get_vacancies(companies)
+        requests_count = len(server.requests)
+        assert hh_api.get_vacancies(companies) == first
+        assert len(server.requests) == requests_count
+
+        hh_api.cache.ttl = 0
+        assert hh_api.get_vacancies(companies) == first
+        assert len(server.requests) == 2 * requests_count
+        assert server.not_modified == requests_count
+
+
+def test_disk_response_cache_eviction(tmp_path):
+    cache = DiskResponseCache(str(tmp_path), max_size=2500)
+    for i in range(5):
+        cache.set(str(i), CachedResponse(b'x' * 1000))
+        time.sleep(0.01)
+    assert cache.get('0') is None
+    assert cache.get('4').body == b'x' * 1000
+    assert sum(f.stat().st_size for f in tmp_path.iterdir()) <= 2500
+
+    # каталог просматривается только при вытеснении, а не при каждом сохранении
+    scans = []
+    cache = DiskResponseCache(str(tmp_path / 'large'), max_size=100000)
+    cache._entries = lambda entries=cache._entries: scans.append(1) or entries()
+    for i in range(50):
+        cache.set(str(i), CachedResponse(b'x' * 1000))
+    assert scans == []
+    with pytest.raises(TypeError):
+        ResponseCache()
+
+
+def test_get_vacancies_retry(hh_vacancies, companies):
+    with StubHHServer(hh_vacancies, failures=2) as server:
+        vacancies = server.api().get_vacancies(companies)
+    assert vacancies == [v for v in hh_vacancies if v['salary']['currency'] == 'RUR']
+    assert server.failed == 2 * 10
+
+
+def test_get_vacancies_retry_after(companies):
+    with StubHHServer([make_hh_vacancy(1, employer_id='0')], failures=1, failure_status=429,
+                      retry_after='1') as server:
+        hh_api = server.api(rate_limiter=TokenBucket(rate=100, capacity=10), retry_policy=RetryPolicy(backoff=0.01))
+        start = time.perf_counter()
+        assert len(hh_api.get_vacancies(companies)) == 1
+        assert time.perf_counter() - start >= 1
+    assert hh_api.rate_limiter.rate < 100
+
+
+def test_get_vacancies_retry_exhausted(hh_vacancies, companies):
+    with StubHHServer(hh_vacancies, failures=3) as server:
+        hh_api = server.api(retry_policy=RetryPolicy(retries=2, backoff=0.01))
+        with pytest.raises(HHAPIError):
+            hh_api.get_vacancies(companies)
+
+        crawler = ShardedCrawler(hh_api, retries=0)
+        assert list(crawler.crawl(companies)) == []
+        assert sorted(shard.employer_id for shard in crawler.failed_shards) == ['0', '1']
+
+
+def test_get_vacancies_retry_truncated(hh_vacancies, companies):
+    with StubHHServer(hh_vacancies, failures=1, truncate=True) as server:
+        vacancies = server.api().get_vacancies(companies)
+        assert vacancies == [v for v in hh_vacancies if v['salary']['currency'] == 'RUR']
+        assert server.failed == 10
+
+    with StubHHServer(hh_vacancies, failures=3, truncate=True) as server:
+        with pytest.raises(HHAPIError):
+            server.api(retry_policy=RetryPolicy(retries=2, backoff=0.01)).get_vacancies(companies)
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=20, capacity=1)
+    start = time.perf_counter()
+    for _ in range(11):
+        bucket.acquire()
+    assert time.perf_counter() - start >= 0.45
+    bucket.on_throttle()
+    assert bucket.rate == 10
+    bucket.on_success()
+    assert bucket.rate == pytest.approx(10.1)
+
+
+@pytest.mark.parametrize('backend', sorted(hh_json.BACKENDS))
+def test_decode_vacancies_page(hh_vacancies, backend):
+    hh_vacancies = hh_vacancies[:100] + [make_hh_vacancy(1001, salary_from=None)]
+    hh_vacancies[1]['salary']['to'] = 5000
+    body = json.dumps({'items': hh_vacancies, 'found': 101, 'pages': 1, 'per_page': 100}).encode('utf-8')
+
+    page = hh_json.BACKENDS[backend](body)
+
+    expected = Vacancy.cast_to_object_list(v for v in hh_vacancies if v['salary'] is None
+                                           or v['salary']['currency'] == 'RUR')
+    assert (page.found, page.pages) == (101, 1)
+    assert [(v.vacancy_id, v.name, v.employer_id, v.employer_name, v.url, v.salary, v.salary_to, v.published_at)
+            for v in page.items] == [(v.vacancy_id, v.name, v.employer_id, v.employer_name, v.url, v.salary,
+                                      v.salary_to, v.published_at) for v in expected]
+    assert page.items[1].salary_to == 5000
+    with pytest.raises(ValueError):
+        hh_json.BACKENDS[backend](b'{"items": [')
+
+
+@pytest.mark.parametrize('backend', sorted(hh_json.BACKENDS))
+def test_decode_vacancies_page_incomplete_items(backend):
+    employer = {'id': '1', 'name': 'Company 1'}
+    items = [
+        {'id': '1', 'name': 'empty salary', 'employer': employer, 'salary': {}},
+        {'id': '2', 'name': 'null salary', 'employer': employer, 'salary': None},
+        {'id': '3', 'name': 'no currency', 'employer': employer, 'salary': {'from': 1000}},
+        {'id': '4', 'name': 'no employer id', 'employer': {'name': 'Anonymous'}},
+        {'id': '5', 'name': 'null employer', 'employer': None},
+        {'id': '6', 'name': 'no employer'},
+        {'id': '7', 'name': 'only to', 'employer': employer, 'salary': {'to': 5000, 'currency': 'RUR'}},
+    ]
+    body = json.dumps({'items': items, 'found': 7, 'pages': 1}).encode('utf-8')
+
+    page = hh_json.BACKENDS[backend](body)
+
+    assert [(v.vacancy_id, v.employer_id, v.salary, v.salary_to) for v in page.items] == [
+        ('1', '1', 0, None), ('2', '1', 0, None), ('7', '1', 0, 5000)]
+    assert page.found == 7
@@ -0,0 +1,48 @@
+from src.metrics import Metrics, metrics
+from src.vacancy import Vacancy
+from tests.hh_stub import StubHHServer, make_hh_vacancy
+
+
+def test_metrics_export():
+    registry = Metrics()
+    registry.inc('requests_total', status=200)
+    registry.inc('requests_total', 2, status=200)
+    registry.inc('requests_total', status=503)
+    for value in (0.0005, 0.02, 20):
+        registry.observe('request_seconds', value)
+    with registry.timer('request_seconds'):
+        pass
+
+    data = registry.to_dict()
+    assert [(c['labels'], c['value']) for c in data['counters']] == [({'status': 200}, 3), ({'status': 503}, 1)]
+    histogram = data['histograms'][0]
+    assert histogram['count'] == 4
+    assert histogram['buckets']['0.001'] == 2
+    assert histogram['buckets']['+Inf'] == 1
+
+    text = registry.to_prometheus()
+    assert text.count('# TYPE requests_total counter') == 1
+    assert 'requests_total{status="200"} 3' in text
+    assert 'request_seconds_bucket{le="0.025"} 3' in text
+    assert 'request_seconds_bucket{le="+Inf"} 4' in text
+    assert 'request_seconds_count 4' in text
+
+    registry.reset()
+    assert registry.to_dict() == {'counters': [], 'histograms': []}
+
+
+def test_hh_api_metrics():
+    metrics.reset()
+    hh_vacancies = [make_hh_vacancy(i, employer_id='1', salary_from=1000 * i) for i in range(1, 251)]
+    with StubHHServer(hh_vacancies) as server:
+        vacancies = list(Vacancy.iter_objects(server.api().get_vacancies([{"1": "Company 1"}])))
+
+    data = metrics.to_dict()
+    counters = {(c['name'], tuple(c['labels'].items())): c['value'] for c in data['counters']}
+    histograms = {h['name']: h for h in data['histograms']}
+    assert len(vacancies) == 250
+    assert counters[('hh_requests_total', (('status', 200),))] == 3
+    assert counters[('hh_response_bytes_total', ())] > 0
+    assert counters[('vacancies_parsed_total', ())] == 250
+    assert histograms['hh_request_seconds']['count'] == 3
+    assert histograms['hh_decode_seconds']['count'] == 3
@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from src.snapshot import Snapshot, SnapshotFileWriter, write_meta
+
+COLUMNS = {'id': 'str', 'name': 'str', 'salary': 'int', 'published_at': 'datetime', 'archived': 'bool'}
+
+
+def copy_lines(rows: int) -> bytes:
+    """строки таблицы в текстовом формате COPY: каждая третья строка с NULL, каждая пятая - с экранированием"""
+
+    lines = []
+    for i in range(rows):
+        name = '\\N' if i % 3 == 0 else (f'Аналитик\\t{i}\\\\' if i % 5 == 0 else f'Python {i}')
+        salary = '\\N' if i % 3 == 0 else str(1000 * i)
+        lines.append(f"{i}\t{name}\t{salary}\t{1714566600000000 + i}\t{'t' if i % 2 else 'f'}\n")
+    return ''.join(lines).encode('utf-8')
+
+
+def expected_name(i: int):
+    return None if i % 3 == 0 else (f'Аналитик\t{i}\\' if i % 5 == 0 else f'Python {i}')
+
+
+def test_snapshot_file_writer(tmp_path):
+    np = pytest.importorskip('numpy')
+    rows = 1000
+    sizes = {'id': sum(len(str(i)) for i in range(rows)),
+             'name': sum(len((expected_name(i) or '').encode('utf-8')) for i in range(rows))}
+    writer = SnapshotFileWriter(str(tmp_path), 'vacancies', COLUMNS, rows, sizes, chunk_size=1000)
+    data = copy_lines(rows)
+    for start in range(0, len(data), 777):
+        writer.write(data[start:start + 777])
+    write_meta(str(tmp_path), {'vacancies': writer.save()})
+
+    snapshot = Snapshot(str(tmp_path))
+    assert isinstance(snapshot.column('vacancies', 'salary'), np.memmap)
+    assert list(snapshot.iter_rows('vacancies', batch_size=100)) == [
+        (str(i), expected_name(i), None if i % 3 == 0 else 1000 * i,
+         datetime.fromtimestamp(1714566600 + i / 1000000, timezone.utc), bool(i % 2)) for i in range(rows)]
+
+    writer = SnapshotFileWriter(str(tmp_path), 'vacancies', COLUMNS, rows - 1, sizes)
+    with pytest.raises(ValueError):
+        writer.write(data)
+        writer.save()
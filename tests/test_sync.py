@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+
+from src.dbmanager import DBManager
+from src.sync import sync_vacancies
+from src.vacancy import Vacancy
+from tests.hh_stub import StubHHServer, make_hh_vacancy
+
+
+def test_sync_vacancies(db_config):
+    now = datetime.now(timezone.utc)
+    companies = [{"1": "Company 1"}]
+    hh_vacancies = [make_hh_vacancy(i, employer_id='1', published_at=now - timedelta(hours=i)) for i in range(1, 51)]
+    expired = make_hh_vacancy(99, employer_id='1', published_at=now - timedelta(days=40))
+
+    with StubHHServer(hh_vacancies + [expired]) as server, DBManager(db_config) as db:
+        db.clear()
+        hh_api = server.api()
+
+        result = sync_vacancies(hh_api, db, companies)
+        assert result == {'fetched': 51, 'archived': 0, 'failed': []}
+        assert len(db.get_all_vacancies()) == 51
+
+        # новые вакансии опубликованы сейчас и попадают в запас SYNC_OVERLAP при следующей синхронизации
+        new_vacancies = [make_hh_vacancy(i, employer_id='1') for i in range(100, 103)]
+        server.vacancies = hh_vacancies + [expired] + new_vacancies
+        server.requests.clear()
+        result = sync_vacancies(hh_api, db, companies)
+        assert result == {'fetched': 3, 'archived': 0, 'failed': []}
+        assert all('date_from' in query or query['per_page'] == ['1'] for query in server.requests)
+        assert len(db.get_all_vacancies()) == 54
+
+        server.vacancies = hh_vacancies[5:] + new_vacancies
+        server.requests.clear()
+        result = sync_vacancies(hh_api, db, companies)
+        assert result == {'fetched': 48, 'archived': 6, 'failed': []}
+        assert any('date_from' not in query and query['per_page'] == ['100'] for query in server.requests)
+        assert {v.vacancy_id for v in db.get_all_vacancies()} == {v['id'] for v in server.vacancies}
+
+        result = sync_vacancies(hh_api, db, companies, full=True)
+        assert result == {'fetched': 48, 'archived': 0, 'failed': []}
+        assert len(db.get_all_vacancies()) == 48
+        assert db.get_companies_and_vacancies_count() == [{'company_name': 'Company 1', 'count': 48}]
+
+        # вакансии компании, которой больше нет в списке, переносятся в архив по сроку публикации
+        db.save_companies([{"2": "Company 2"}])
+        db.save_vacancies(Vacancy.cast_to_object_list(
+            [make_hh_vacancy(200, employer_id='2', published_at=now - timedelta(days=40))]))
+        result = sync_vacancies(hh_api, db, companies)
+        assert result == {'fetched': 3, 'archived': 1, 'failed': []}
+        db.clear()
+
+
+def test_sync_vacancies_foreign_currency(db_config):
+    now = datetime.now(timezone.utc)
+    companies = [{"1": "Company 1"}]
+    hh_vacancies = [make_hh_vacancy(i, employer_id='1', salary_from=1000 * i, currency='USD' if i % 10 == 0 else 'RUR',
+                                    published_at=now - timedelta(hours=i)) for i in range(1, 301)]
+
+    with StubHHServer(hh_vacancies) as server, DBManager(db_config) as db:
+        db.clear()
+        hh_api = server.api()
+
+        assert sync_vacancies(hh_api, db, companies) == {'fetched': 270, 'archived': 0, 'failed': []}
+
+        # вакансии не в рублях есть в выдаче, но не в БД: без изменений полная синхронизация не нужна
+        server.requests.clear()
+        assert sync_vacancies(hh_api, db, companies) == {'fetched': 0, 'archived': 0, 'failed': []}
+        assert all('date_from' in query or query['per_page'] == ['1'] for query in server.requests)
+        assert len(server.requests) == 2
+
+        server.vacancies = hh_vacancies[1:]
+        server.requests.clear()
+        assert sync_vacancies(hh_api, db, companies) == {'fetched': 269, 'archived': 1, 'failed': []}
+        assert any('date_from' not in query and query['per_page'] == ['100'] for query in server.requests)
+        assert len(db.get_all_vacancies()) == 269
+        db.clear()